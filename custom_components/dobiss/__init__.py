@@ -2,19 +2,31 @@
 import asyncio
 from datetime import timedelta
 import logging
+import os
+import time
 # import voluptuous as vol
 import async_timeout
 
 from .dobiss import DobissSystem
+from .entity import signalInstallationChanged
+from .frametrace import FrameCapture
+from .polling import AdaptiveSchedule
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import Store
 # from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 # import homeassistant.helpers.config_validation as cv
 
-from .const import DOMAIN, PLATFORMS, DEFAULT_PORT, DEFAULT_SCAN_INTERVAL
+from .const import DOMAIN, PLATFORMS, DEFAULT_PORT, DEFAULT_SCAN_INTERVAL, DEFAULT_IDLE_TIMEOUT, \
+    DEFAULT_ADAPTIVE_POLLING, DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL, DEFAULT_PUSH_LISTENER, DEFAULT_PUSH_INTERVAL, \
+    CONF_IDLE_TIMEOUT, CONF_ADAPTIVE_POLLING, CONF_MIN_INTERVAL, CONF_MAX_INTERVAL, CONF_PUSH_LISTENER, \
+    CONF_PUSH_INTERVAL, CONF_CONFIG_ENTRY_ID, STORAGE_VERSION, UPDATE_TIMEOUT, FOCUS_INTERVAL, FOCUS_DURATION, SERVICES
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -60,25 +72,22 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     # Prefer options (set via Options Flow), then data, then default
     scan_seconds = entry.options.get(CONF_SCAN_INTERVAL, entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL))
     update_interval = timedelta(seconds=scan_seconds)
+    idle_timeout = entry.options.get(CONF_IDLE_TIMEOUT, defaultIdleTimeout(scan_seconds))
 
     _LOGGER.info(f"Setting up Dobiss Control entry with data {str(entry.data)} and options {str(entry.options)}")
 
-    # Create from config entry
+    # Create from config entry; every entry (controller) has its own coordinator, connection and schedule
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = entry.data
 
-    await setupCoordinator(hass, host, port, update_interval)
+    await migrateUniqueIds(hass, entry)
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-
-    # Register service to re-import installation
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    coordinator = await setupCoordinator(hass, entry, host, port, update_interval, idle_timeout)
+    configurePolling(coordinator, entry)
+    configurePush(coordinator, entry)
 
-    async def handle_importInstallation(call):
-        _LOGGER.info("Importing Dobiss installation via service call")
-        await coordinator.importInstallation()
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    hass.services.async_register(DOMAIN, "importInstallation", handle_importInstallation)
+    registerServices(hass)
 
     # Listen for options updates to adjust polling interval without re-adding
     async def _update_listener(hass: HomeAssistant, updated_entry: ConfigEntry):
@@ -88,10 +97,18 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             updated_entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
         )
         new_interval = timedelta(seconds=new_scan_seconds)
-        if coordinator.update_interval != new_interval:
+        if coordinator.scanInterval != new_interval:
             _LOGGER.info(f"Updating Dobiss polling interval to {new_scan_seconds}s via Options")
+            coordinator.scanInterval = new_interval
             coordinator.update_interval = new_interval
 
+        # Apply adaptive polling; it takes over the interval from the next poll on
+        configurePolling(coordinator, updated_entry)
+
+        # Apply idle release window; takes effect the next time the connection is returned
+        coordinator.dobiss.idleTimeout = updated_entry.options.get(CONF_IDLE_TIMEOUT,
+                                                                   defaultIdleTimeout(new_scan_seconds))
+
         # Apply host/port changes if any
         new_host = updated_entry.options.get(CONF_HOST, updated_entry.data.get(CONF_HOST))
         new_port = updated_entry.options.get(CONF_PORT, updated_entry.data.get(CONF_PORT))
@@ -99,14 +116,20 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             _LOGGER.info(f"Updating Dobiss connection to {new_host}:{new_port} via Options")
             try:
                 # Ensure any existing connection is closed
-                coordinator.dobiss.disconnect()
+                coordinator.dobiss.close()
             except Exception:  # noqa: BLE001
                 pass
-            # Replace DobissSystem with new connection parameters
-            coordinator.dobiss = DobissSystem(new_host, new_port)
+            # Replace DobissSystem with new connection parameters, keeping a running capture
+            capture = coordinator.dobiss.stopCapture()
+            coordinator.dobiss = DobissSystem(new_host, new_port, coordinator.dobiss.idleTimeout)
+            if capture is not None:
+                coordinator.dobiss.startCapture(capture)
             # Trigger a refresh to validate new connection lazily
             await coordinator.async_request_refresh()
 
+        # Apply listener mode; the connection is kept open from the next poll on
+        configurePush(coordinator, updated_entry)
+
     entry.async_on_unload(entry.add_update_listener(_update_listener))
 
     return True
@@ -126,56 +149,250 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
 
     cfg = hass.data.get(DOMAIN)
     _LOGGER.debug(f"{DOMAIN} hass data: {cfg}")
-    if unload_ok and cfg and cfg.get(entry.entry_id):
-        cfg.pop(entry.entry_id)
+
+    # Stop the I/O scheduler and any capture, and release the (possibly idle) connection
+    if unload_ok and cfg and entry.entry_id in cfg:
+        coordinator = cfg.pop(entry.entry_id)
+        coordinator.stopFocus()
+        dobiss = coordinator.dobiss
+        dobiss.close()
+        capture = dobiss.stopCapture()
+        if capture is not None:
+            await hass.async_add_executor_job(capture.close)
+
+    # The services stay as long as there is a controller to route them to
+    if unload_ok and not cfg:
+        for service in SERVICES:
+            hass.services.async_remove(DOMAIN, service)
 
     return unload_ok
 
 
-async def setupCoordinator(hass, host, port, update_interval):
-    _LOGGER.info(f"Creating update coordinator")
-    if DOMAIN in hass.data:
-        domainData = hass.data[DOMAIN]
-        if "coordinator" in domainData:
-            _LOGGER.warning("Warning: hass data already contains a coordinator. It will be overwritten!")
-        _LOGGER.debug(f"Current hass {DOMAIN} data: {str(domainData)}")
+def defaultIdleTimeout(scanSeconds):
+    """The idle timeout when none is configured: shorter than the scan interval, so the connection
+       is released between polls and the Dobiss Pro app can get in.
+    """
+    return min(DEFAULT_IDLE_TIMEOUT, scanSeconds // 2)
+
+
+def registerServices(hass):
+    """Register the services once; calls go to the controller of their config entry, or to all controllers."""
+    if hass.services.has_service(DOMAIN, "importInstallation"):
+        return
 
-    coordinator = DobissDataUpdateCoordinator(hass, host=host, port=port, update_interval=update_interval)
-    await coordinator.async_refresh()
+    async def handle_importInstallation(call):
+        _LOGGER.info("Importing Dobiss installation via service call")
+        full = call.data.get("full", False)
+        await asyncio.gather(*(coordinator.syncInstallation(full) for coordinator in serviceCoordinators(hass, call)))
+
+    # Capture the raw traffic to a file in the config folder (see tools/replay.py)
+    async def handle_startCapture(call):
+        coordinators = serviceCoordinators(hass, call)
+        for coordinator in coordinators:
+            filename = captureFilename(call.data.get("filename"), coordinator.dobiss.host, len(coordinators) > 1)
+            capture = await hass.async_add_executor_job(FrameCapture, hass.config.path(filename))
+            previous = coordinator.dobiss.startCapture(capture)
+            if previous is not None:
+                await hass.async_add_executor_job(previous.close)
+
+    async def handle_stopCapture(call):
+        for coordinator in serviceCoordinators(hass, call):
+            capture = coordinator.dobiss.stopCapture()
+            if capture is not None:
+                await hass.async_add_executor_job(capture.close)
+
+    hass.services.async_register(DOMAIN, "importInstallation", handle_importInstallation)
+    hass.services.async_register(DOMAIN, "startCapture", handle_startCapture)
+    hass.services.async_register(DOMAIN, "stopCapture", handle_stopCapture)
+
+
+def serviceCoordinators(hass, call):
+    """The coordinators a service call is for: the one of its config entry, or all of them."""
+    coordinators = hass.data.get(DOMAIN, {})
+    entryId = call.data.get(CONF_CONFIG_ENTRY_ID)
+    if entryId is None:
+        return list(coordinators.values())
+    if entryId not in coordinators:
+        raise HomeAssistantError(f"No loaded Dobiss controller with config entry {entryId}")
+    return [coordinators[entryId]]
+
+
+def captureFilename(filename, host, perHost):
+    """The capture file name; the host is added when one call captures several controllers."""
+    if not filename:
+        return f"dobiss-{host}-{time.strftime('%Y%m%d-%H%M%S')}.cap"
+    filename = os.path.basename(filename)
+    if perHost:
+        root, ext = os.path.splitext(filename)
+        filename = f"{root}-{host}{ext}"
+    return filename
+
+
+async def migrateUniqueIds(hass, entry):
+    """Prefix the unique ids of output entities created before multiple controllers were supported.
+       The bare "<module>.<index>" ids would collide between controllers.
+    """
+    prefix = f"{entry.entry_id}."
+
+    @callback
+    def migrate(entityEntry):
+        if entityEntry.domain == "sensor" or entityEntry.unique_id.startswith(prefix):
+            return None
+        _LOGGER.debug(f"Migrating unique id of {entityEntry.entity_id} to {prefix}{entityEntry.unique_id}")
+        return {'new_unique_id': f"{prefix}{entityEntry.unique_id}"}
+
+    await er.async_migrate_entries(hass, entry.entry_id, migrate)
+
+
+def configurePolling(coordinator, entry):
+    """Switch adaptive polling on or off according to the entry options."""
+    if entry.options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING):
+        # Options saved before the intervals were validated may hold 0, which would poll back-to-back
+        minInterval = max(1, entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL))
+        maxInterval = max(1, entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL))
+        schedule = coordinator.adaptive
+        if schedule is None or (schedule.minInterval, schedule.maxInterval) != (minInterval, maxInterval):
+            _LOGGER.info(f"Dobiss adaptive polling between {minInterval}s and {maxInterval}s")
+            coordinator.adaptive = AdaptiveSchedule(minInterval, maxInterval)
+    elif coordinator.adaptive is not None:
+        _LOGGER.info("Dobiss adaptive polling disabled")
+        coordinator.adaptive = None
+        coordinator.update_interval = coordinator.scanInterval
+
+
+def configurePush(coordinator, entry):
+    """Switch listening for pushed status changes on or off according to the entry options."""
+    listening = entry.options.get(CONF_PUSH_LISTENER, DEFAULT_PUSH_LISTENER)
+    coordinator.pushInterval = entry.options.get(CONF_PUSH_INTERVAL, DEFAULT_PUSH_INTERVAL)
+    coordinator.dobiss.onPush = coordinator.pushReceived
+    if listening != coordinator.dobiss.listening:
+        _LOGGER.info(f"Dobiss push listener {'enabled' if listening else 'disabled'}")
+        coordinator.dobiss.setListening(listening)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Remove the cached installation of a deleted config entry."""
+    await installationStore(hass, entry).async_remove()
+
+
+def installationStore(hass, entry):
+    """The storage of the imported installation of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+
+
+async def setupCoordinator(hass, entry, host, port, update_interval, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    _LOGGER.info(f"Creating update coordinator for {host}:{port}")
+    coordinator = DobissDataUpdateCoordinator(hass, entry, host=host, port=port, update_interval=update_interval,
+                                              idle_timeout=idle_timeout)
+    if await coordinator.loadInstallation():
+        # Entities are created from the cache right away; the first poll and the check
+        # of the cached installation against the controller run in the background
+        coordinator.async_set_updated_data(coordinator.dobiss.values.snapshot())
+        hass.async_create_task(coordinator.revalidateInstallation())
+    else:
+        await coordinator.async_refresh()
 
     # Store the coordinator
-    hass.data[DOMAIN]["coordinator"] = coordinator
+    hass.data[DOMAIN][entry.entry_id] = coordinator
 
     _LOGGER.debug(f"New hass {DOMAIN} data: {str(hass.data[DOMAIN])}")
-
-    return True
+    return coordinator
 
 
 class DobissDataUpdateCoordinator(DataUpdateCoordinator):
     """Class to manage fetching Dobiss data from the LAN controller."""
 
-    def __init__(self, hass, host, port, update_interval):
+    def __init__(self, hass, entry, host, port, update_interval, idle_timeout=DEFAULT_IDLE_TIMEOUT):
         """Initialize."""
         _LOGGER.info(f"Initializing Dobiss System with host {host} and port {port}...")
-        self.dobiss = DobissSystem(host, port)
+        self.dobiss = DobissSystem(host, port, idle_timeout)
+        self.entry = entry
+        self._store = installationStore(hass, entry)
 
         self.setupCompleted = False
 
+        # Output values of the previous update (a StatusSnapshot) and what changed since:
+        # {(moduleAddress, index): (old, new)}
+        # None means every entity must be updated (first update or recovery after a failure)
+        self._previousValues = None
+        self.changes = None
+
+        # Adaptive per-module polling schedule; None polls every module each update_interval
+        self.adaptive = None
+        self.scanInterval = update_interval
+
+        # Poll interval while the controller pushes its changes (see configurePush)
+        self.pushInterval = DEFAULT_PUSH_INTERVAL
+
+        # Focused polls of the modules with moving covers: moduleAddress -> task
+        self._focus = {}
+        # Modules whose covers still moved when their focus ran out (e.g. a stuck relay); they are
+        # not focused again until a command is sent to them or their covers stop
+        self._focusSpent = set()
+
+        # Polls confirming a command with adaptive polling: moduleAddress -> task
+        self._confirm = {}
+
         super().__init__(
             hass,
             _LOGGER,
-            name=DOMAIN,
+            name=f"{DOMAIN} {host}:{port}",
             update_interval=update_interval,
         )
 
     async def importInstallation(self):
         """Import installation"""
         _LOGGER.info("Importing Dobiss installation...")
-        await self.dobiss.connect()
-        await self.dobiss.importFullInstallation()
-        # Release connection so other clients (e.g., Dobiss Pro app) can use the controller
-        self.dobiss.disconnect()
+        async with self.dobiss.lease():
+            complete = await self.dobiss.importFullInstallation(self.importProgress)
+        if complete:
+            await self._store.async_save(self.dobiss.exportInstallation())
         _LOGGER.info("Importing Dobiss installation done")
+        return complete
+
+    def importProgress(self, modulesDone, moduleCount, bytesReceived):
+        _LOGGER.debug(f"Imported the outputs of {modulesDone}/{moduleCount} Dobiss modules, {bytesReceived} bytes")
+
+    async def loadInstallation(self):
+        """Restore the installation cached at a previous start. Returns False if there is none."""
+        data = await self._store.async_load()
+        if not data:
+            return False
+
+        try:
+            self.dobiss.restoreInstallation(data)
+        except (KeyError, TypeError, ValueError) as e:
+            _LOGGER.warning(f"Ignoring invalid cached Dobiss installation: {str(e)}")
+            return False
+
+        _LOGGER.info(f"Dobiss installation restored from cache: {len(self.dobiss.outputs)} outputs")
+        self.setupCompleted = True
+        return True
+
+    async def revalidateInstallation(self):
+        """Poll, then check all of the cached installation against the controller."""
+        await self.async_refresh()
+        if not await self.syncInstallation(full=True):
+            # Keep using what we know until we get a complete import
+            _LOGGER.warning("Could not revalidate the cached Dobiss installation")
+
+    async def syncInstallation(self, full=False):
+        """Import the installation again, only downloading the outputs of added or changed modules
+           (or of all modules if full), and add, update or remove their entities in place.
+           Returns True if everything was imported.
+        """
+        _LOGGER.info("Synchronizing Dobiss installation...")
+        async with self.dobiss.lease():
+            changes = await self.dobiss.syncInstallation(full, self.importProgress)
+
+        if changes.complete:
+            await self._store.async_save(self.dobiss.exportInstallation())
+        if changes.added or changes.removed or changes.changed:
+            _LOGGER.info(f"The Dobiss installation changed: {len(changes.added)} outputs added, "
+                         f"{len(changes.removed)} removed and {len(changes.changed)} changed")
+            async_dispatcher_send(self.hass, signalInstallationChanged(self.entry.entry_id))
+        _LOGGER.info("Synchronizing Dobiss installation done")
+        return changes.complete
 
     async def async_setup(self):
         """Setup in the background"""
@@ -192,14 +409,193 @@ class DobissDataUpdateCoordinator(DataUpdateCoordinator):
         # We use a time-out to be sure
         # Note: asyncio.TimeoutError and aiohttp.ClientError are already
         # handled by the data update coordinator.
-        async with async_timeout.timeout(10):
-            # Connect, poll, and disconnect to avoid holding the controller exclusively
-            _LOGGER.debug("Requesting all statuses...")
-            await self.dobiss.connect()
-            try:
-                await self.dobiss.requestAllStatus()
-            finally:
-                # Ensure we release the connection for other apps
-                self.dobiss.disconnect()
-            _LOGGER.debug("Requesting all statuses done")
-            return self.dobiss.values
+        start = time.monotonic()
+        try:
+            async with async_timeout.timeout(UPDATE_TIMEOUT):
+                # The lease keeps the connection open for the next poll or command and releases
+                # it when idle, so we do not hold the controller exclusively
+                if self.dobiss.pushHealthy(self.pushInterval):
+                    return await self.pollSafetyNet()
+                if self.adaptive is not None:
+                    return await self.pollAdaptive()
+
+                _LOGGER.debug("Requesting all statuses...")
+                async with self.dobiss.lease():
+                    await self.dobiss.requestAllStatus()
+                _LOGGER.debug(f"Requesting all statuses done {self.dobiss.connectionStats} {self.dobiss.queueStats}")
+                self.update_interval = self.scanInterval
+                return self.diffValues()
+        finally:
+            # Timed out polls are recorded too; they show how close the others come to the time-out
+            self.dobiss.timings.record('poll', time.monotonic() - start)
+
+    async def pollAdaptive(self):
+        """Poll only the modules that are due and schedule the next update for the earliest module.
+           Returns the snapshot of the values.
+        """
+        schedule = self.adaptive
+        now = time.monotonic()
+
+        # Commands count as activity on their module
+        for moduleAddr, when in self.dobiss.lastActions.items():
+            schedule.activity(moduleAddr, when)
+
+        due = schedule.due(self.dobiss.modules.keys(), now)
+        _LOGGER.debug(f"Requesting statuses of modules {due}...")
+        async with self.dobiss.lease():
+            await self.dobiss.requestAllStatus(due)
+        snapshot = self.diffValues()
+
+        # Changes counted as activity when diffValues saw them, also those a push published first
+        for moduleAddr in due:
+            schedule.polled(moduleAddr, False, now)
+
+        self.update_interval = timedelta(seconds=schedule.nextPoll(self.dobiss.modules.keys(), time.monotonic()))
+        _LOGGER.debug(f"Next Dobiss poll in {self.update_interval.total_seconds():.1f}s {schedule.intervals}")
+        return snapshot
+
+    async def pollSafetyNet(self):
+        """Poll all modules while the controller pushes its changes, in case a push got lost, and schedule
+           the next update for when the pushes have been quiet for pushInterval. Returns the snapshot of the values.
+        """
+        _LOGGER.debug("Requesting all statuses as a safety net for the pushed changes...")
+        async with self.dobiss.lease():
+            await self.dobiss.requestAllStatus()
+        snapshot = self.diffValues()
+
+        if self.changes:
+            # The pushes missed a change, so do not rely on them until the next one arrives
+            _LOGGER.info(f"Dobiss outputs changed without a push: {self.changes}")
+            self.dobiss.lastPush = None
+
+        if self.dobiss.pushHealthy(self.pushInterval):
+            quiet = self.dobiss.lastPush + self.pushInterval - time.monotonic()
+            self.update_interval = timedelta(seconds=max(1, quiet))
+        else:
+            self.update_interval = self.scanInterval
+        _LOGGER.debug(f"Next Dobiss poll in {self.update_interval.total_seconds():.1f}s")
+        return snapshot
+
+    @callback
+    def pushReceived(self, moduleAddrs):
+        """Hand the values the controller pushed to the entities right away, without moving the next poll.
+           moduleAddrs is None when the connection carrying the pushes was lost.
+        """
+        if moduleAddrs is None:
+            _LOGGER.info("Dobiss push connection lost, polling normally again")
+            self.hass.async_create_task(self.async_request_refresh())
+            return
+
+        self.publishValues()
+
+    @callback
+    def publishValues(self):
+        """Hand the current values to the entities between regular updates, without moving the next poll."""
+        self.data = self.diffValues()
+        self.async_update_listeners()
+
+    @callback
+    def focusModule(self, moduleAddr):
+        """Poll only this module every FOCUS_INTERVAL seconds while one of its covers moves,
+           so the covers see where the movement ends without raising the scan rate of all modules.
+        """
+        if moduleAddr not in self._focus and moduleAddr not in self._focusSpent:
+            self._focus[moduleAddr] = self.hass.async_create_task(self._pollFocused(moduleAddr))
+
+    async def _pollFocused(self, moduleAddr):
+        deadline = time.monotonic() + FOCUS_DURATION
+        try:
+            while True:
+                if time.monotonic() >= deadline:
+                    # Still moving after FOCUS_DURATION: leave the module to the regular polls
+                    _LOGGER.info(f"Dobiss module {moduleAddr} still drives a cover after {FOCUS_DURATION}s")
+                    self._focusSpent.add(moduleAddr)
+                    break
+                await asyncio.sleep(FOCUS_INTERVAL)
+                async with self.dobiss.lease():
+                    await self.dobiss.requestAllStatus([moduleAddr])
+                self.publishValues()
+                if not self.coversMoving(moduleAddr):
+                    break
+        finally:
+            del self._focus[moduleAddr]
+
+    def stopFocus(self):
+        """Cancel the focused and confirming polls, e.g. when unloading."""
+        for task in (*self._focus.values(), *self._confirm.values()):
+            task.cancel()
+
+    @callback
+    def pollSoon(self, moduleAddr, delay):
+        """Poll only this module once after delay seconds, unless such a poll is already pending."""
+        if moduleAddr not in self._confirm and moduleAddr not in self._focus:
+            self._confirm[moduleAddr] = self.hass.async_create_task(self._pollConfirm(moduleAddr, delay))
+
+    async def _pollConfirm(self, moduleAddr, delay):
+        try:
+            await asyncio.sleep(delay)
+            async with self.dobiss.lease():
+                await self.dobiss.requestAllStatus([moduleAddr])
+            self.publishValues()
+            if self.adaptive is not None:
+                # A change counted as activity when publishValues saw it
+                self.adaptive.polled(moduleAddr, False, time.monotonic())
+        finally:
+            del self._confirm[moduleAddr]
+
+    def coversMoving(self, moduleAddr):
+        """True if an Up or Down output of the module is on."""
+        values = self.dobiss.values
+        return any(
+            values.value(moduleAddr, output.index)
+            for outputType in (DobissSystem.OutputType.Up, DobissSystem.OutputType.Down)
+            for output in self.dobiss.outputs.ofType(outputType)
+            if output.moduleAddress == moduleAddr
+        )
+
+    def diffValues(self):
+        """Take a snapshot of the output values, store the changes since the previous update and return it."""
+        snapshot = self.dobiss.values.snapshot()
+        changes = snapshot.changes(self._previousValues)
+        if changes and self._previousValues is not None:
+            self.changesSeen({moduleAddr for moduleAddr, _ in changes})
+        self._previousValues = snapshot
+
+        # Entities must also be updated when they become available again
+        self.changes = changes if self.last_update_success else None
+        if changes:
+            _LOGGER.debug(f"Dobiss outputs changed: {changes}")
+        return snapshot
+
+    def changesSeen(self, moduleAddrs):
+        """Outputs of these modules changed. This is recorded as soon as a change is seen, whether a poll,
+           a push or a command publishes it, as self.changes only holds the changes of the last update.
+        """
+        now = time.monotonic()
+        for moduleAddr in moduleAddrs:
+            if self.adaptive is not None:
+                self.adaptive.activity(moduleAddr, now)
+            if moduleAddr in self._focusSpent and not self.coversMoving(moduleAddr):
+                self._focusSpent.discard(moduleAddr)
+
+    @callback
+    def commandSent(self, moduleAddr):
+        """Push the values written through by a command to the entities; a poll confirms them.
+           This does not move the next regular poll, so a stream of commands cannot postpone it.
+           With adaptive polling, whose next poll may be far away, the module is polled after
+           the minimum interval. A command also lets the covers of the module be focused again.
+        """
+        self._focusSpent.discard(moduleAddr)
+        self.publishValues()
+        if self.adaptive is not None:
+            self.pollSoon(moduleAddr, self.adaptive.minInterval)
+
+    def uniqueId(self, outputId):
+        """The unique id of the entity of an output (or cover), unique across controllers."""
+        return f"{self.entry.entry_id}.{outputId}"
+
+    def hasChanged(self, moduleAddr, index):
+        """True if the entity of this output must write its state after the last update."""
+        if self.changes is None or not self.last_update_success:
+            return True
+        return (moduleAddr, index) in self.changes
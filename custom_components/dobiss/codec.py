@@ -0,0 +1,175 @@
+"""
+Binary frame codec for the Dobiss LAN controller (DO5437) protocol.
+
+Requests are 16-byte frames:
+    AF <command> <module type> <module address> <sub command> 00 <record size> <record count> <record size> FF*6 AF
+The controller echoes every request padded to 32 bytes, followed by the response padded to 32 bytes.
+"""
+
+import struct
+from enum import IntEnum
+from functools import lru_cache
+from typing import NamedTuple, List, Optional
+
+MAX_MODULES = 82  # Module addresses 1-82
+MAX_OUTPUTS = 12  # Outputs of a relais module; the other modules have 4
+STATUS_FRAME_SIZE = 64  # A status request echo and its 16-byte status, both padded to 32 bytes
+DEFAULT_SOFT_DIM = 0xFF  # Soft dim field value for the dim speed configured in the module
+MAX_SOFT_DIM = 60  # Longest soft dim (seconds) sent in one action; longer transitions are sent in steps
+
+_FRAME = struct.Struct(">9B6sB")
+_ACTION_RECORD = struct.Struct(">8B")
+_OUTPUT_LINE = struct.Struct(">30sBB")
+_FILLER = b"\xFF" * 6
+
+
+class ModuleType(IntEnum):
+    """The type of module."""
+    Relais = 0x08
+    Dimmer = 0x10
+    V0_10 = 0x18
+
+
+class OutputType(IntEnum):
+    """The type of output."""
+    Light = 0x00
+    Plug = 0x01
+    Fan = 0x02
+    Up = 0x03
+    Down = 0x04
+
+
+class Action(IntEnum):
+    """The type of action."""
+    TurnOff = 0x00
+    TurnOn = 0x01
+    Toggle = 0x02
+
+
+# Enum lookups by value, which are much cheaper than calling the enum
+_OUTPUT_TYPES = {outputType.value: outputType for outputType in OutputType}
+
+# Bit positions set in each possible byte of the installation bitmap
+_BITS = [tuple(bit for bit in range(8) if (byte >> bit) & 1) for byte in range(256)]
+
+
+class ModuleRecord(NamedTuple):
+    """A module as described by the controller."""
+    address: int
+    type: ModuleType
+    isMaster: bool
+    outputCount: int
+
+
+class OutputRecord(NamedTuple):
+    """An output as described in the output name table of its module."""
+    moduleAddress: int
+    index: int
+    name: str
+    type: OutputType
+    groupIndex: int
+
+
+def _frame(command, moduleType, moduleAddr, subCommand, recordSize, recordCount):
+    return _FRAME.pack(0xAF, command, moduleType, moduleAddr, subCommand, 0x00, recordSize, recordCount, recordSize,
+                       _FILLER, 0xAF)
+
+
+# Encoders. The frames only depend on a handful of small integers, so they are built once and cached.
+
+INSTALLATION_REQUEST = _frame(0x0B, 0x00, 0x00, 0x30, 0x10, 0x01)
+
+
+@lru_cache(maxsize=None)
+def moduleRequest(moduleAddr):
+    """The frame requesting the description of a module."""
+    return _frame(0x10, 0xFF, moduleAddr, 0x00, 0x10, 0x01)
+
+
+@lru_cache(maxsize=None)
+def outputsRequest(moduleType, moduleAddr, outputCount):
+    """The frame requesting the output name table of a module."""
+    return _frame(0x10, moduleType, moduleAddr, 0x01, 0x20, outputCount)
+
+
+@lru_cache(maxsize=None)
+def statusRequest(moduleType, moduleAddr):
+    """The frame requesting the status of all outputs of a module."""
+    return _frame(0x01, moduleType, moduleAddr, 0x00, 0x00, 0x01)
+
+
+@lru_cache(maxsize=None)
+def actionHeader(moduleAddr, recordCount):
+    """The frame announcing recordCount action records for a module."""
+    return _frame(0x02, 0xFF, moduleAddr, 0x00, 0x08, recordCount)
+
+
+def softDimByte(transition):
+    """The soft dim field for a transition of the given seconds (whole seconds, at most MAX_SOFT_DIM),
+       or DEFAULT_SOFT_DIM without a transition.
+    """
+    if transition is None:
+        return DEFAULT_SOFT_DIM
+    return min(MAX_SOFT_DIM, max(0, round(transition)))
+
+
+def softDimSeconds(softDim):
+    """The seconds of the transition in a soft dim field; 0 for the module default."""
+    return 0 if softDim == DEFAULT_SOFT_DIM else softDim
+
+
+def actionRecord(moduleAddr, outputIndex, action, value=100, delayOn=0xFF, delayOff=0xFF, softDim=0xFF, red=0xFF):
+    """The 8-byte action record for one output."""
+    return _ACTION_RECORD.pack(moduleAddr, outputIndex, action, delayOn, delayOff, int(value), softDim, red)
+
+
+# Decoders
+
+def decodeInstallation(data) -> List[int]:
+    """The addresses of the modules present in the installation bitmap.
+       The first 11 bytes (bits 0-81) tell whether there is a module with address 1-82.
+    """
+    addresses = [
+        byteNum * 8 + bit + 1
+        for byteNum, byte in enumerate(data[:(MAX_MODULES + 7) // 8])
+        for bit in _BITS[byte]
+    ]
+    # The last byte only holds 2 valid bits
+    while addresses and addresses[-1] > MAX_MODULES:
+        addresses.pop()
+    return addresses
+
+
+def decodeModule(data) -> ModuleRecord:
+    """A 16-byte module description: byte 0 is the address, the LSB of byte 2 the master flag
+       and byte 14 the module type. Relais modules have 12 outputs, the others 4.
+    """
+    moduleType = ModuleType(data[14])
+    outputCount = MAX_OUTPUTS if moduleType == ModuleType.Relais else 4
+    return ModuleRecord(data[0], moduleType, (data[2] & 1) == 1, outputCount)
+
+
+def decodeOutputs(moduleAddr, data, outputCount) -> List[OutputRecord]:
+    """An output name table of outputCount lines of 32 bytes: a 30-character name,
+       the icon type (0=light, 1=plug, 2=fan, 3=up, 4=down) and the group index.
+    """
+    return [
+        OutputRecord(moduleAddr, index, name.strip().decode(), _OUTPUT_TYPES[outputType], groupIndex)
+        for index, (name, outputType, groupIndex) in enumerate(_OUTPUT_LINE.iter_unpack(data[:32 * outputCount]))
+    ]
+
+
+def decodeStatusFrame(frame) -> Optional[int]:
+    """The module address in a 16-byte status frame, i.e. the echo of a status request or the
+       same header in front of a status the controller sends unsolicited, or None if it is not one.
+    """
+    if frame[0] != 0xAF or frame[15] != 0xAF or frame[1] != 0x01:
+        return None
+    return frame[3]
+
+
+def decodeStatus(data, outputCount):
+    """The values (0-100) of the first outputCount outputs in a 16-byte status record.
+       Returns a slice of data, without copying if data is a memoryview.
+    """
+    return data[:outputCount]
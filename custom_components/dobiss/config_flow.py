@@ -1,8 +1,11 @@
 from homeassistant import config_entries
 from homeassistant.helpers import config_entry_flow
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_SCAN_INTERVAL
-from .const import DOMAIN, DEFAULT_PORT, DEFAULT_SCAN_INTERVAL
+from .const import DOMAIN, DEFAULT_PORT, DEFAULT_SCAN_INTERVAL, DEFAULT_ADAPTIVE_POLLING, \
+    DEFAULT_MIN_INTERVAL, DEFAULT_MAX_INTERVAL, DEFAULT_PUSH_LISTENER, DEFAULT_PUSH_INTERVAL, CONF_IDLE_TIMEOUT, \
+    CONF_ADAPTIVE_POLLING, CONF_MIN_INTERVAL, CONF_MAX_INTERVAL, CONF_PUSH_LISTENER, CONF_PUSH_INTERVAL
 import voluptuous as vol
+from . import defaultIdleTimeout
 
 # TODO Discovery
 # async def _async_has_devices(hass) -> bool:
@@ -47,6 +50,12 @@ class DobissOptionsFlowHandler(config_entries.OptionsFlow):
                 CONF_HOST: user_input[CONF_HOST],
                 CONF_PORT: user_input[CONF_PORT],
                 CONF_SCAN_INTERVAL: user_input[CONF_SCAN_INTERVAL],
+                CONF_IDLE_TIMEOUT: user_input[CONF_IDLE_TIMEOUT],
+                CONF_ADAPTIVE_POLLING: user_input[CONF_ADAPTIVE_POLLING],
+                CONF_MIN_INTERVAL: user_input[CONF_MIN_INTERVAL],
+                CONF_MAX_INTERVAL: user_input[CONF_MAX_INTERVAL],
+                CONF_PUSH_LISTENER: user_input[CONF_PUSH_LISTENER],
+                CONF_PUSH_INTERVAL: user_input[CONF_PUSH_INTERVAL],
             })
 
         # Defaults: prefer existing options, then data, then global defaults
@@ -62,10 +71,22 @@ class DobissOptionsFlowHandler(config_entries.OptionsFlow):
             CONF_SCAN_INTERVAL,
             self.config_entry.data.get(CONF_SCAN_INTERVAL, DEFAULT_SCAN_INTERVAL),
         )
+        current_idle = self.config_entry.options.get(CONF_IDLE_TIMEOUT, defaultIdleTimeout(current_scan))
+        current_adaptive = self.config_entry.options.get(CONF_ADAPTIVE_POLLING, DEFAULT_ADAPTIVE_POLLING)
+        current_min = self.config_entry.options.get(CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL)
+        current_max = self.config_entry.options.get(CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)
+        current_push = self.config_entry.options.get(CONF_PUSH_LISTENER, DEFAULT_PUSH_LISTENER)
+        current_push_interval = self.config_entry.options.get(CONF_PUSH_INTERVAL, DEFAULT_PUSH_INTERVAL)
         data_schema = {
             vol.Required(CONF_HOST, default=current_host): str,
             vol.Optional(CONF_PORT, default=current_port): int,
-            vol.Optional(CONF_SCAN_INTERVAL, default=current_scan): int,
+            vol.Optional(CONF_SCAN_INTERVAL, default=current_scan): vol.All(int, vol.Range(min=1)),
+            vol.Optional(CONF_IDLE_TIMEOUT, default=current_idle): vol.All(int, vol.Range(min=0)),
+            vol.Optional(CONF_ADAPTIVE_POLLING, default=current_adaptive): bool,
+            vol.Optional(CONF_MIN_INTERVAL, default=current_min): vol.All(int, vol.Range(min=1)),
+            vol.Optional(CONF_MAX_INTERVAL, default=current_max): vol.All(int, vol.Range(min=1)),
+            vol.Optional(CONF_PUSH_LISTENER, default=current_push): bool,
+            vol.Optional(CONF_PUSH_INTERVAL, default=current_push_interval): vol.All(int, vol.Range(min=1)),
         }
         return self.async_show_form(step_id="init", data_schema=vol.Schema(data_schema))
 
@@ -94,7 +115,7 @@ async def setupStep(flow, user_input, check_unique=True, step_name="user"):
     data_schema = {
         vol.Required(CONF_HOST): str,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): int,
-        vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int
+        vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): vol.All(int, vol.Range(min=1))
     }
 
     return flow.async_show_form(step_id=step_name, data_schema=vol.Schema(data_schema))
@@ -1,7 +1,31 @@
 """Constants for Dobiss integration"""
 
 DOMAIN = "dobiss"
-PLATFORMS = ["light", "fan", "switch", "cover"]
+PLATFORMS = ["light", "fan", "switch", "cover", "sensor"]
 
 DEFAULT_PORT = 10001
 DEFAULT_SCAN_INTERVAL = 10
+DEFAULT_IDLE_TIMEOUT = 5  # Below the default scan interval, so the controller is free between polls
+DEFAULT_ADAPTIVE_POLLING = False
+DEFAULT_MIN_INTERVAL = 1
+DEFAULT_MAX_INTERVAL = 60
+DEFAULT_PUSH_LISTENER = False
+DEFAULT_PUSH_INTERVAL = 300
+
+UPDATE_TIMEOUT = 10  # Seconds a coordinator update may take
+FOCUS_INTERVAL = 0.5  # Seconds between the polls of a module while one of its covers moves
+FOCUS_DURATION = 180  # Seconds a module is polled at the focus interval at most
+
+CONF_IDLE_TIMEOUT = "idle_timeout"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
+CONF_PUSH_LISTENER = "push_listener"
+CONF_PUSH_INTERVAL = "push_interval"
+CONF_CONFIG_ENTRY_ID = "config_entry_id"
+CONF_OPEN_TIME = "open_time"
+CONF_CLOSE_TIME = "close_time"
+
+SERVICES = ["importInstallation", "startCapture", "stopCapture"]
+
+STORAGE_VERSION = 1
@@ -1,36 +1,57 @@
 """Dobiss Cover (screens/roller shutters) Control"""
 import logging
+import time
 from typing import Dict, List, Optional, Tuple
 
+import voluptuous as vol
+
 from homeassistant.components.cover import (
+    ATTR_CURRENT_POSITION,
+    ATTR_POSITION,
     CoverEntity,
     CoverEntityFeature,
 )
+from homeassistant.core import callback
+from homeassistant.helpers import entity_platform, entity_registry as er
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import DOMAIN, CONF_OPEN_TIME, CONF_CLOSE_TIME
+from .entity import setupEntities
+from . import status
 from .dobiss import DobissSystem
+from .registry import Output, OutputRegistry
+from .travel import TravelModel, STOPPED, OPENING, CLOSING, OPEN, CLOSED
 
 _LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the Dobiss Cover platform."""
-    coordinator = hass.data[DOMAIN]["coordinator"]
-
-    # Build covers by pairing Up/Down outputs.
-    covers: List[Dict] = _pair_covers(coordinator.dobiss.outputs)
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
     _LOGGER.info("Adding covers (roller shutters/screens)...")
-    _LOGGER.debug(str(covers))
 
-    async_add_entities(
-        HomeAssistantDobissCover(coordinator, cover) for cover in covers
+    # Build covers by pairing Up/Down outputs, again whenever a re-import changes the installation.
+    setupEntities(hass, config_entry, async_add_entities, "cover",
+                  lambda: {cover["unique_id"]: cover for cover in _pair_covers(coordinator.dobiss.outputs)},
+                  lambda cover: HomeAssistantDobissCover(coordinator, cover))
+
+    # Travel times enable the position of a cover; they are kept in the entity registry
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        "setTravelTime",
+        {
+            vol.Required(CONF_OPEN_TIME): vol.All(vol.Coerce(float), vol.Range(min=0)),
+            vol.Optional(CONF_CLOSE_TIME): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        },
+        "async_set_travel_time",
     )
     _LOGGER.info("Dobiss covers added.")
 
 
-def _pair_covers(outputs: List[Dict]) -> List[Dict]:
+def _pair_covers(outputs: OutputRegistry) -> List[Dict]:
     """Pair Up/Down outputs into single cover descriptors.
 
     Strategy:
@@ -42,6 +63,10 @@ def _pair_covers(outputs: List[Dict]) -> List[Dict]:
       keeping per-module groupings and supporting duplicate names.
     - As a last resort, any single unpaired Up or Down becomes a one-direction
       cover entity (you will only be able to drive the available direction).
+
+    The registry indexes the outputs by (moduleAddress, groupIndex) and hands them out in
+    import order, which keeps the outputs of a module together and in index order, so only
+    the groups of the Up and Down outputs are visited and pairs within a module need no sorting.
     """
     from collections import defaultdict, deque
 
@@ -52,34 +77,31 @@ def _pair_covers(outputs: List[Dict]) -> List[Dict]:
                 return n[: -len(suffix)].strip()
         return n
 
-    # First pass: index by (moduleAddress, groupIndex) and keep all entries per key
-    ups_map: Dict[Tuple[int, int], List[Dict]] = defaultdict(list)
-    downs_map: Dict[Tuple[int, int], List[Dict]] = defaultdict(list)
+    up, down = DobissSystem.OutputType.Up, DobissSystem.OutputType.Down
 
-    for out in outputs:
-        if out.get("type") == DobissSystem.OutputType.Up:
-            ups_map[(out["moduleAddress"], out["groupIndex"])].append(out)
-        elif out.get("type") == DobissSystem.OutputType.Down:
-            downs_map[(out["moduleAddress"], out["groupIndex"])].append(out)
+    # First pass: the (moduleAddress, groupIndex) keys of the Up and Down outputs, in import order
+    all_keys = dict.fromkeys(
+        (out.moduleAddress, out.groupIndex) for outputType in (up, down) for out in outputs.ofType(outputType)
+    )
 
     covers: List[Dict] = []
 
     # Greedy pairing within each (module, groupIndex)
-    leftover_ups: List[Dict] = []
-    leftover_downs: List[Dict] = []
+    leftover_ups: List[Output] = []
+    leftover_downs: List[Output] = []
 
-    all_keys = set(ups_map.keys()) | set(downs_map.keys())
     for key in all_keys:
-        ups_list = ups_map.get(key, [])
-        downs_list = downs_map.get(key, [])
+        group = outputs.inGroup(*key)
+        ups_list = [out for out in group if out.type == up]
+        downs_list = [out for out in group if out.type == down]
         if ups_list and downs_list:
             # Use name-based pairing first within the key
             ups_by_name: Dict[str, deque] = defaultdict(deque)
             downs_by_name: Dict[str, deque] = defaultdict(deque)
-            for u in sorted(ups_list, key=lambda x: x.get("index", 0)):
-                ups_by_name[norm_name(u.get("name"))].append(u)
-            for d in sorted(downs_list, key=lambda x: x.get("index", 0)):
-                downs_by_name[norm_name(d.get("name"))].append(d)
+            for u in ups_list:
+                ups_by_name[norm_name(u.name)].append(u)
+            for d in downs_list:
+                downs_by_name[norm_name(d.name)].append(d)
 
             matched_names = set(ups_by_name.keys()) & set(downs_by_name.keys())
             for nm in sorted(matched_names):
@@ -91,8 +113,8 @@ def _pair_covers(outputs: List[Dict]) -> List[Dict]:
             # Collect remaining in lists by index order to pair loosely
             remaining_ups = [u for q in ups_by_name.values() for u in q]
             remaining_downs = [d for q in downs_by_name.values() for d in q]
-            remaining_ups.sort(key=lambda x: x.get("index", 0))
-            remaining_downs.sort(key=lambda x: x.get("index", 0))
+            remaining_ups.sort(key=lambda x: x.index)
+            remaining_downs.sort(key=lambda x: x.index)
 
             # Pair by closest indices greedily
             iu = id = 0
@@ -112,14 +134,13 @@ def _pair_covers(outputs: List[Dict]) -> List[Dict]:
             leftover_downs.extend(downs_list)
 
     # Cross-key name-based pairing while preserving module boundary and supporting duplicates
-    from collections import defaultdict as dd
-    up_index: Dict[Tuple[int, str], deque] = dd(deque)
-    down_index: Dict[Tuple[int, str], deque] = dd(deque)
+    up_index: Dict[Tuple[int, str], deque] = defaultdict(deque)
+    down_index: Dict[Tuple[int, str], deque] = defaultdict(deque)
 
-    for u in sorted(leftover_ups, key=lambda x: (x["moduleAddress"], x.get("index", 0))):
-        up_index[(u["moduleAddress"], norm_name(u.get("name")))].append(u)
-    for d in sorted(leftover_downs, key=lambda x: (x["moduleAddress"], x.get("index", 0))):
-        down_index[(d["moduleAddress"], norm_name(d.get("name")))].append(d)
+    for u in sorted(leftover_ups, key=lambda x: x.key):
+        up_index[(u.moduleAddress, norm_name(u.name))].append(u)
+    for d in sorted(leftover_downs, key=lambda x: x.key):
+        down_index[(d.moduleAddress, norm_name(d.name))].append(d)
 
     common_keys = set(up_index.keys()) & set(down_index.keys())
     for k in sorted(common_keys):
@@ -139,14 +160,9 @@ def _pair_covers(outputs: List[Dict]) -> List[Dict]:
     return covers
 
 
-def _build_cover_descriptor(up: Optional[Dict], down: Optional[Dict]) -> Dict:
+def _build_cover_descriptor(up: Optional[Output], down: Optional[Output]) -> Dict:
     """Create a cover descriptor dictionary from Up/Down outputs."""
-    name_parts = []
-    module_addr = up["moduleAddress"] if up else down["moduleAddress"]
-    if up:
-        name_parts.append(up.get("name") or "")
-    if down and (not up or down.get("name") != up.get("name")):
-        name_parts.append(down.get("name") or "")
+    module_addr = up.moduleAddress if up else down.moduleAddress
 
     # Derive a cleaned base name
     def tidy(n: str) -> str:
@@ -157,14 +173,14 @@ def _build_cover_descriptor(up: Optional[Dict], down: Optional[Dict]) -> Dict:
             return n[:-5].strip()
         return n
 
-    base_name = tidy(up.get("name") if up else down.get("name")) or "Cover"
+    base_name = tidy(up.name if up else down.name) or "Cover"
 
     # unique id from available components
     uid_parts = [str(module_addr)]
     if up:
-        uid_parts.append(f"U{up['index']}")
+        uid_parts.append(f"U{up.index}")
     if down:
-        uid_parts.append(f"D{down['index']}")
+        uid_parts.append(f"D{down.index}")
 
     return {
         "moduleAddress": module_addr,
@@ -175,14 +191,99 @@ def _build_cover_descriptor(up: Optional[Dict], down: Optional[Dict]) -> Dict:
     }
 
 
-class HomeAssistantDobissCover(CoordinatorEntity, CoverEntity):
-    """Representation of a Dobiss cover (screen or roller shutter)."""
+class HomeAssistantDobissCover(CoordinatorEntity, CoverEntity, RestoreEntity):
+    """Representation of a Dobiss cover (screen or roller shutter).
+
+    Without travel times only the direction is known. With travel times (see the setTravelTime
+    service) the position is estimated from how long the cover moved, which also allows moving
+    it to a position. While it moves, its module is polled at a high rate to see where it stops.
+    """
 
     def __init__(self, coordinator, cover: Dict):
         super().__init__(coordinator)
         self.dobiss = coordinator.dobiss
         self._cover = cover
         self._name = cover["name"]
+        up, down = cover.get("up"), cover.get("down")
+        self._upOffset = status.offset(up.moduleAddress, up.index) if up else None
+        self._downOffset = status.offset(down.moduleAddress, down.index) if down else None
+
+        # Position estimate, None without travel times, and the pending stop of a move to a position
+        self._travel: Optional[TravelModel] = None
+        self._stopHandle = None
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        # Continue from the position estimated before the restart
+        lastState = await self.async_get_last_state()
+        self._configureTravel(lastState.attributes.get(ATTR_CURRENT_POSITION) if lastState else None)
+        self._followOutputs()
+
+    async def async_will_remove_from_hass(self):
+        self._cancelStop()
+        await super().async_will_remove_from_hass()
+
+    @callback
+    def async_registry_entry_updated(self):
+        self._configureTravel()
+
+    def _configureTravel(self, position=None, registryEntry=None):
+        """Create, update or drop the travel model according to the travel times in the entity registry
+           (in registryEntry, the registry entry of this entity by default).
+        """
+        registryEntry = registryEntry or self.registry_entry
+        options = registryEntry.options.get(DOMAIN, {}) if registryEntry else {}
+        openTime = options.get(CONF_OPEN_TIME)
+        if not openTime:
+            self._travel = None
+            return
+        closeTime = options.get(CONF_CLOSE_TIME) or openTime
+        if self._travel is None:
+            self._travel = TravelModel(openTime, closeTime, position)
+        else:
+            self._travel.openTime, self._travel.closeTime = openTime, closeTime
+
+    async def async_set_travel_time(self, open_time, close_time=None):
+        """Store the seconds a full open and close take; 0 removes the position again."""
+        # self.registry_entry is only updated after this service call, so use the updated entry
+        registryEntry = er.async_get(self.hass).async_update_entity_options(self.entity_id, DOMAIN, {
+            CONF_OPEN_TIME: open_time,
+            CONF_CLOSE_TIME: close_time if close_time is not None else open_time,
+        })
+        self._configureTravel(registryEntry=registryEntry)
+        self.async_write_ha_state()
+
+    def _direction(self):
+        """The direction the outputs drive the cover in at the last update."""
+        if self.is_opening:
+            return OPENING
+        if self.is_closing:
+            return CLOSING
+        return STOPPED
+
+    def _followOutputs(self):
+        """Follow the direction of the outputs in the travel model; a moving cover gets its module polled fast.
+           Returns True if it is moving.
+        """
+        direction = self._direction()
+        if self._travel is not None:
+            self._travel.follow(direction, time.monotonic())
+        if direction != STOPPED:
+            self.coordinator.focusModule(self._cover["moduleAddress"])
+            return True
+        self._cancelStop()
+        return False
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Only write the state if the Up or Down output changed in the last update, or the position moves."""
+        if self._followOutputs() and self._travel is not None:
+            self.async_write_ha_state()
+            return
+        for output in (self._cover.get("up"), self._cover.get("down")):
+            if output and self.coordinator.hasChanged(output.moduleAddress, output.index):
+                self.async_write_ha_state()
+                return
 
     @property
     def name(self):
@@ -202,67 +303,109 @@ class HomeAssistantDobissCover(CoordinatorEntity, CoverEntity):
 
     @property
     def unique_id(self):
-        return self._cover["unique_id"]
+        return self.coordinator.uniqueId(self._cover["unique_id"])
 
     @property
     def supported_features(self):
         features = CoverEntityFeature.OPEN | CoverEntityFeature.CLOSE
         # We can always stop by switching off both directions
         features |= CoverEntityFeature.STOP
+        if self._travel is not None and self._cover.get("up") and self._cover.get("down"):
+            features |= CoverEntityFeature.SET_POSITION
         return features
 
+    @property
+    def current_cover_position(self):
+        if self._travel is None:
+            return None
+        position = self._travel.position(time.monotonic())
+        return round(position) if position is not None else None
+
     @property
     def is_closed(self):
-        # Unknown without position feedback
-        return None
+        # Unknown without position feedback, unless estimated from the travel times
+        position = self.current_cover_position
+        if position is None:
+            return None
+        return position == CLOSED
 
     @property
     def is_opening(self):
-        up = self._cover.get("up")
-        if not up:
+        if self._upOffset is None:
             return False
-        val = self.coordinator.data.get(up["moduleAddress"], [0] * (up["index"] + 1))[up["index"]]
-        return val == 100
+        return self.coordinator.data[self._upOffset] == 100
 
     @property
     def is_closing(self):
-        down = self._cover.get("down")
-        if not down:
+        if self._downOffset is None:
             return False
-        val = self.coordinator.data.get(down["moduleAddress"], [0] * (down["index"] + 1))[down["index"]]
-        return val == 100
+        return self.coordinator.data[self._downOffset] == 100
 
     async def async_open_cover(self, **kwargs):
         up = self._cover.get("up")
         if not up:
             _LOGGER.warning("No Up output available for cover '%s'", self._name)
             return
+        self._cancelStop()
         # Ensure Down is off
         await self._turn_dir(off=self._cover.get("down"))
         # Start Up
         await self._turn_dir(on=up)
-        await self.coordinator.async_request_refresh()
+        self.coordinator.commandSent(self._cover["moduleAddress"])
 
     async def async_close_cover(self, **kwargs):
         down = self._cover.get("down")
         if not down:
             _LOGGER.warning("No Down output available for cover '%s'", self._name)
             return
+        self._cancelStop()
         # Ensure Up is off
         await self._turn_dir(off=self._cover.get("up"))
         # Start Down
         await self._turn_dir(on=down)
-        await self.coordinator.async_request_refresh()
+        self.coordinator.commandSent(self._cover["moduleAddress"])
 
     async def async_stop_cover(self, **kwargs):
+        self._cancelStop()
         # Stop by turning both directions off
         await self._turn_dir(off=self._cover.get("up"))
         await self._turn_dir(off=self._cover.get("down"))
-        await self.coordinator.async_request_refresh()
+        self.coordinator.commandSent(self._cover["moduleAddress"])
+
+    async def async_set_cover_position(self, **kwargs):
+        """Move for as long as the travel model says it takes to reach the position, then stop."""
+        target = kwargs[ATTR_POSITION]
+        travelTime = self._travel.travelTime(target, time.monotonic()) if self._travel else None
+        if travelTime is None:
+            if target not in (OPEN, CLOSED):
+                _LOGGER.warning("The position of cover '%s' is unknown, open or close it fully first", self._name)
+                return
+            travelTime = OPEN if target == OPEN else -OPEN
+        if travelTime == 0:
+            return
+
+        if travelTime > 0:
+            await self.async_open_cover()
+        else:
+            await self.async_close_cover()
+
+        # The ends are reached by running until the controller stops the cover
+        if target not in (OPEN, CLOSED):
+            self._stopHandle = async_call_later(self.hass, abs(travelTime), self._stopAtPosition)
+
+    @callback
+    def _stopAtPosition(self, _now):
+        self._stopHandle = None
+        self.hass.async_create_task(self.async_stop_cover())
+
+    def _cancelStop(self):
+        if self._stopHandle is not None:
+            self._stopHandle()
+            self._stopHandle = None
 
-    async def _turn_dir(self, on: Optional[Dict] = None, off: Optional[Dict] = None):
+    async def _turn_dir(self, on: Optional[Output] = None, off: Optional[Output] = None):
         if off:
-            await self.dobiss.setOff(off["moduleAddress"], off["index"])
+            await self.dobiss.setOff(off.moduleAddress, off.index)
         if on:
             # Use relay-type action: 100% on
-            await self.dobiss.setOn(on["moduleAddress"], on["index"], 100)
+            await self.dobiss.setOn(on.moduleAddress, on.index, 100)
@@ -0,0 +1,45 @@
+"""Diagnostics support for Dobiss."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_HOST}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    """Return the installation, the current values, the connection statistics and the recent protocol trace."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    dobiss = coordinator.dobiss
+
+    return {
+        'entry': {
+            'data': async_redact_data(dict(entry.data), TO_REDACT),
+            'options': async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        'installation': dobiss.exportInstallation(),
+        'values': dobiss.values.asdict(),
+        'unconfirmed': [
+            {'module': moduleAddr, 'index': index, 'value': value}
+            for (moduleAddr, index), (value, _) in dobiss.unconfirmed.items()
+        ],
+        'connection': {
+            'connected': dobiss.connected,
+            'pipelined': dobiss.pipelined,
+            'listening': dobiss.listening,
+            'idleTimeout': dobiss.idleTimeout,
+            'reuses': dobiss.connectionReuses,
+            **dobiss.counters,
+            'misalignedFrames': dobiss.misalignedFrames,
+        },
+        'polling': {
+            'lastUpdateSuccess': coordinator.last_update_success,
+            'updateInterval': coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            'adaptiveIntervals': coordinator.adaptive.intervals if coordinator.adaptive is not None else None,
+        },
+        'queues': dobiss.queueStats,
+        'timings': dobiss.timings.asdict(),
+        'trace': dobiss.trace.asdict(),
+    }
@@ -2,36 +2,133 @@
 Helper module for communicating with a Dobiss home automation system.
 """
 
-import socket
 import logging
 import asyncio
-from enum import IntEnum
+import collections
+import contextlib
+import functools
+import math
+import time
+from typing import List, NamedTuple
+
+try:
+    from . import codec
+    from .scheduler import DobissScheduler, Priority
+    from .stats import Timings
+    from .frametrace import FrameTrace, SENT
+    from .registry import Output, OutputRegistry
+    from .status import StatusStore
+    from .transport import DobissProtocol
+except ImportError:  # Used as a standalone module (see test.py)
+    import codec
+    from scheduler import DobissScheduler, Priority
+    from stats import Timings
+    from frametrace import FrameTrace, SENT
+    from registry import Output, OutputRegistry
+    from status import StatusStore
+    from transport import DobissProtocol
 
-RECV_SIZE = 1024
 MAX_NUM_RETRIES = 10
 TIMEOUT = 1  # We can use a short timeout on the LAN
-RETRY_DELAY = 1  # Set the delay between retries in seconds
+CONNECT_TIMEOUT = 5  # Seconds to wait for the TCP handshake
+MAX_RECEIVE_TIMEOUTS = 3  # Receive timeouts in a row after which the connection is considered dead
+IDLE_TIMEOUT = 5  # Seconds an unused connection is kept open before it is released
+MAX_PIPELINE_FAILURES = 3  # Failed pipelined polls in a row before falling back to sequential polling
+PIPELINE_RETRY_INTERVAL = 600  # Seconds of sequential polling before pipelining is tried again
+POLL_CHUNK_SIZE = 8  # Modules polled per pipelined job; commands can go in between jobs
+IMPORT_CHUNK_SIZE = 8  # Import requests in flight per pipelined job
+MAX_ACTIONS_PER_FRAME = 12  # Action records per frame, enough to switch a full relay module at once
+CONFIRM_GRACE = 3  # Seconds an optimistic value survives polls reporting otherwise (e.g., while soft dimming)
 
 _LOGGER = logging.getLogger(__name__)
 
 
+class InstallationChanges(NamedTuple):
+    """The result of syncInstallation."""
+    complete: bool
+    added: List[Output]
+    removed: List[Output]
+    changed: List[Output]
+
+
 class DobissSystem:
 
-    def __init__(self, host, port):
+    def __init__(self, host, port, idleTimeout=IDLE_TIMEOUT):
 
         self._host = host
         self._port = port
         self._connected = False
 
-        self.socket = None
-        # self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        # self.socket.settimeout(TIMEOUT)
-        self.recvBuffer = bytearray()
+        self.protocol = None
+
+        # All I/O runs as jobs on the scheduler so polls and commands never interleave
+        self.scheduler = DobissScheduler()
+
+        # Actions waiting to be sent together in the next burst
+        self._pendingActions = None
+        self._pendingFlush = None
+
+        # Monotonic time of the last action sent to each module
+        self.lastActions = {}
+
+        # Optimistic values set by actions and not yet confirmed by a poll: (moduleAddr, index) -> (value, sentAt)
+        # sentAt is moved to the end of the soft dim of the action, if any
+        self.unconfirmed = {}
+
+        # Transitions longer than one soft dim, sent in steps: (moduleAddr, index) -> task
+        self._fades = {}
+
+        # Connection lease: the connection is shared by back-to-back polls and commands
+        # and released after idleTimeout seconds without users (0 releases it immediately)
+        self.idleTimeout = idleTimeout
+        self._leases = 0
+        self._idleHandle = None
+        self._connectLock = asyncio.Lock()  # One connect at a time, or the transport of the other would leak
+        self.connectionReuses = 0
+        self.connectionReconnects = 0
+
+        # Pipelined status polling, switched off for a while if the controller cannot keep up
+        self.pipelined = True
+        self._pipelineFailures = 0
+        self._pipelineRetryAt = None
+
+        # Receive path health
+        self.misalignedFrames = 0
+        self.resyncs = 0
+        self.receiveFailures = 0
+        self._receiveTimeouts = 0
+
+        # Instrumentation: durations per connect, request type and poll, and traffic counters
+        self.timings = Timings()
+        self.connectRetries = 0
+        self.shortReads = 0
+        self.bytesSent = 0
+        self.bytesReceived = 0
+
+        # The last raw sends and receives, for the diagnostics download
+        self.trace = FrameTrace()
+
+        # Optional capture of all raw sends and receives to a file (see startCapture)
+        self.capture = None
+
+        # Listener mode (see setListening): the connection stays open and status frames the
+        # controller sends on its own are applied right away. onPush(moduleAddrs) is called
+        # after they were applied and onPush(None) when the connection carrying them is lost.
+        self.listening = False
+        self.onPush = None
+        self.lastPush = None
+        self.pushFrames = 0
+        self._inJob = False
+        # Status requests of the running job whose response was not read yet, and those that
+        # were never answered on this connection, by module address. Their status frames are
+        # our own (late) responses, not pushes.
+        self._pendingStatus = collections.Counter()
+        self._lateStatus = collections.Counter()
 
         self.availableModules = []
         self.modules = {}
-        self.outputs = []
-        self.values = {}
+        self.outputs = OutputRegistry()
+        self.values = StatusStore()
 
     @property
     def host(self):
@@ -46,364 +143,920 @@ class DobissSystem:
     @property
     def connected(self):
         """True if the socket is connected"""
-        return self._connected
+        return self._connected and self.protocol is not None and not self.protocol.closed
 
     @property
-    def lights(self):
-        result = []
-        for output in self.outputs:
-            if output['type'] == DobissSystem.OutputType.Light:
-                result.append(output)
+    def connectionStats(self):
+        """How often a lease could reuse the open connection and how often it had to connect."""
+        return {
+            'reuses': self.connectionReuses,
+            'reconnects': self.connectionReconnects,
+        }
 
-        return result
+    @property
+    def frameStats(self):
+        """How often the echo was not where we expected it, how often we found it again and how often we gave up."""
+        return {
+            'misaligned': self.misalignedFrames,
+            'resyncs': self.resyncs,
+            'failures': self.receiveFailures,
+        }
 
     @property
-    def fans(self):
-        result = []
-        for output in self.outputs:
-            if output['type'] == DobissSystem.OutputType.Fan:
-                result.append(output)
+    def counters(self):
+        """Connection and traffic counters since this system was created."""
+        return {
+            'reconnects': self.connectionReconnects,
+            'connectRetries': self.connectRetries,
+            'receiveFailures': self.receiveFailures,
+            'shortReads': self.shortReads,
+            'resyncs': self.resyncs,
+            'bytesSent': self.bytesSent,
+            'bytesReceived': self.bytesReceived,
+            'pushFrames': self.pushFrames,
+        }
 
-        return result
+    @property
+    def queueStats(self):
+        """Queue depth and wait time per priority class of the I/O scheduler."""
+        return self.scheduler.stats
 
     @property
-    def plugs(self):
-        result = []
-        for output in self.outputs:
-            if output['type'] == DobissSystem.OutputType.Plug:
-                result.append(output)
+    def lights(self):
+        return self.outputs.ofType(DobissSystem.OutputType.Light)
+
+    @property
+    def fans(self):
+        return self.outputs.ofType(DobissSystem.OutputType.Fan)
 
-        return result
+    @property
+    def plugs(self):
+        return self.outputs.ofType(DobissSystem.OutputType.Plug)
 
-    async def connect(self):
+    async def connect(self, attempts=MAX_NUM_RETRIES):
         """Connect to a Dobiss system.
-           Keeps trying to connect until it is successfully connected.
+           Keeps trying to connect until it is successfully connected, at most attempts times.
+           Concurrent calls wait for the connect in progress instead of opening a second connection.
         """
-        retry_delay = 1  # Initial delay in seconds
-        retries = 0
-        while not self._connected and retries < MAX_NUM_RETRIES:
-            try:
-                _LOGGER.info(f"connect through connect_logic")
-                self.connect_logic()
-            except socket.error as e:
-                _LOGGER.error(f"Dobiss socket error while trying to connect: {str(e)}")
-                # self.disconnect()
-                self._connected = False
-                retries += 1
-                if retries < MAX_NUM_RETRIES:
-                    _LOGGER.debug(f"Retrying in {retry_delay} seconds...")
-                    # time.sleep(retry_delay)
-                    await asyncio.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                    # self.connect_logic()
-                else:
-                    _LOGGER.error("Maximum retry attempts reached. Connection failed.")
-                    break
-
-    def connect_logic(self):
+        async with self._connectLock:
+            retry_delay = 1  # Initial delay in seconds
+            retries = 0
+            while not self.connected and retries < attempts:
+                try:
+                    _LOGGER.info(f"connect through connect_logic")
+                    await self.connect_logic()
+                except (OSError, asyncio.TimeoutError) as e:
+                    _LOGGER.error(f"Dobiss socket error while trying to connect: {str(e)}")
+                    self._connected = False
+                    retries += 1
+                    self.connectRetries += 1
+                    if retries < attempts:
+                        _LOGGER.debug(f"Retrying in {retry_delay} seconds...")
+                        await asyncio.sleep(retry_delay)
+                        retry_delay *= 2  # Exponential backoff
+                    elif attempts > 1:
+                        _LOGGER.error("Maximum retry attempts reached. Connection failed.")
+
+    async def connect_logic(self):
         _LOGGER.info(f"Connecting to Dobiss system at IP {self.host} and port {self.port}")
-        # self.socket.connect((self.host, self.port))
-        self.socket = socket.create_connection((self.host, self.port))
+        if self.protocol is not None:
+            # Drop a connection that was lost underneath us
+            self.protocol.close()
+            self.protocol = None
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        _, self.protocol = await asyncio.wait_for(
+            loop.create_connection(
+                lambda: DobissProtocol(self.recordFrame, self._dataReceived, self._connectionLost), self.host, self.port),
+            CONNECT_TIMEOUT)
+        self.timings.record('connect', time.monotonic() - start)
         self._connected = True
-        # self.socket.settimeout(None)
+        self._forgetStatusRequests()
         _LOGGER.info("Connected to Dobiss system.")
 
+    @contextlib.asynccontextmanager
+    async def lease(self):
+        """Keep the connection for a sequence of requests, e.g. the jobs of a poll.
+           The connection is not released while a lease is held, and its release is scheduled
+           once the last lease is returned and the connection stays idle. Connecting is left to
+           the jobs (see submit), so all connects run on the scheduler, one at a time.
+        """
+        self._cancelIdleRelease()
+        self._leases += 1
+        try:
+            yield self
+        finally:
+            self._leases -= 1
+            if self._leases == 0:
+                self._scheduleIdleRelease()
+
+    def _scheduleIdleRelease(self):
+        if self.listening:
+            # The controller can only push over an open connection
+            return
+        if not self.idleTimeout or self.idleTimeout <= 0:
+            self.disconnect()
+            return
+        loop = asyncio.get_running_loop()
+        self._idleHandle = loop.call_later(self.idleTimeout, self._releaseIdle)
+
+    def _cancelIdleRelease(self):
+        if self._idleHandle is not None:
+            self._idleHandle.cancel()
+            self._idleHandle = None
+
+    def _releaseIdle(self):
+        """Release the connection so other clients (e.g., Dobiss Pro app) can use the controller."""
+        self._idleHandle = None
+        if self._leases == 0 and self.protocol is not None:
+            _LOGGER.debug(f"Releasing Dobiss connection after {self.idleTimeout}s idle")
+            self.disconnect()
+
+    async def submit(self, priority, job, *args):
+        """Run job(*args) on the scheduler, holding a connection lease while it runs.
+           Jobs must not submit other jobs, as they would wait for themselves.
+        """
+        async def leased():
+            async with self.lease():
+                await self.ensureConnected()
+                self._inJob = True
+                try:
+                    return await job(*args)
+                except asyncio.CancelledError:
+                    # The job may have stopped halfway a request, so the stream cannot be trusted
+                    self.disconnect()
+                    raise
+                finally:
+                    self._inJob = False
+                    # What was not answered during the job may still come in late
+                    self._lateStatus += self._pendingStatus
+                    self._pendingStatus.clear()
+                    # Handle what the controller pushed after the last response of the job
+                    if self.listening:
+                        self.consumePush()
+
+        return await self.scheduler.run(priority, leased)
+
+    async def ensureConnected(self):
+        """Reuse the open connection, or connect if there is none.
+           Jobs make one attempt instead of holding up the other jobs for the whole backoff of
+           connect; the next poll or command tries again.
+        """
+        if self.connected:
+            self.connectionReuses += 1
+        else:
+            self.connectionReconnects += 1
+            await self.connect(attempts=1)
+
+    def close(self):
+        """Stop the scheduler and any transitions in progress, and disconnect."""
+        for task in self._fades.values():
+            task.cancel()
+        self.scheduler.stop()
+        self.disconnect()
+
     def disconnect(self):
         """Disconnect from the connected Dobiss system."""
         _LOGGER.info("Disconnecting from Dobiss system")
+        self._cancelIdleRelease()
         try:
-            if self.socket:
-                self.socket.close()
-        except socket.error as e:
+            if self.protocol:
+                self.protocol.close()
+        except OSError as e:
             _LOGGER.error(f"Dobiss socket error {str(e)}")
         finally:
-            self.socket = None
+            self.protocol = None
             self._connected = False
+            self._forgetStatusRequests()
+
+    def setListening(self, listening):
+        """Switch listener mode on or off. The connection is opened by the next job and then kept open."""
+        if listening == self.listening:
+            return
+        self.listening = listening
+        self.lastPush = None
+        if listening:
+            self._cancelIdleRelease()
+        elif self._leases == 0 and self.protocol is not None:
+            self._scheduleIdleRelease()
+
+    def pushHealthy(self, timeout):
+        """True if listening on an open connection that carried a pushed status in the last timeout seconds."""
+        return self.listening and self.connected and self.lastPush is not None and \
+            time.monotonic() - self.lastPush < timeout
+
+    def _dataReceived(self):
+        # During a job, receiveResponse handles pushed frames that get in the way of a response
+        if self.listening and not self._inJob:
+            self.consumePush()
+
+    def _connectionLost(self, protocol):
+        # Connections we replaced or closed ourselves are no news
+        if protocol is not self.protocol or not self.listening:
+            return
+        self.lastPush = None
+        if self.onPush is not None:
+            self.onPush(None)
+
+    def _forgetStatusRequests(self):
+        # Responses never arrive on another connection
+        self._pendingStatus.clear()
+        self._lateStatus.clear()
+
+    def consumePush(self):
+        """Apply the status frames at the start of the receive buffer that the controller sent on its own.
+           Returns the number of frames applied. A status frame of a module whose status request is
+           in flight is left for receiveResponse, and one of a module whose request was never
+           answered is dropped as a late response. Anything else is left for receiveResponse to skip.
+        """
+        buffer = self.recvBuffer
+        moduleAddrs = []
+        while buffer is not None and len(buffer) >= codec.STATUS_FRAME_SIZE:
+            moduleAddr = codec.decodeStatusFrame(buffer.peek(0, 16))
+            if moduleAddr is None or self._pendingStatus[moduleAddr] > 0:
+                break
+            if self._lateStatus[moduleAddr] > 0:
+                self._lateStatus[moduleAddr] -= 1
+                _LOGGER.debug(f"Dropping a late Dobiss status response of module {moduleAddr}")
+            else:
+                module = self.modules.get(moduleAddr)
+                if module is not None and self.parseStatus(moduleAddr, module['outputCount'], buffer.peek(32, 48)):
+                    moduleAddrs.append(moduleAddr)
+            buffer.consume(codec.STATUS_FRAME_SIZE)
+            self.bytesReceived += codec.STATUS_FRAME_SIZE
+
+        if moduleAddrs:
+            self.pushFrames += len(moduleAddrs)
+            self.lastPush = time.monotonic()
+            _LOGGER.debug(f"Dobiss pushed the status of modules {moduleAddrs}")
+            if self.onPush is not None:
+                self.onPush(moduleAddrs)
+        return len(moduleAddrs)
+
+    def recordFrame(self, direction, data):
+        """Record raw data sent or received in the trace and the capture, if any."""
+        self.trace.record(direction, data)
+        if self.capture is not None:
+            self.capture.record(direction, data)
+
+    def startCapture(self, capture):
+        """Stream every raw send and receive to capture (a FrameCapture).
+           Returns the capture that was running, if any; closing it is up to the caller.
+        """
+        previous = self.stopCapture()
+        self.capture = capture
+        _LOGGER.info(f"Capturing Dobiss traffic to {capture.path}")
+        return previous
+
+    def stopCapture(self):
+        """Stop capturing. Returns the capture that was running, if any; closing it is up to the caller."""
+        capture, self.capture = self.capture, None
+        if capture is not None:
+            _LOGGER.info(f"Captured {capture.records} Dobiss records to {capture.path}")
+        return capture
+
+    @property
+    def recvBuffer(self):
+        """The receive buffer holding the bytes from the controller that were not consumed yet."""
+        if self.protocol is None:
+            return None
+        return self.protocol.buffer
 
     async def sendData(self, data):
-        _LOGGER.debug(f"sendData {str(data)}")
         """Send data to a Dobiss system.
-           Keeps trying to send the data until it is successful, reconnecting with the system if necessary.
+           Reconnects with the system and sends the data again if the connection was lost.
         """
-        # dataSent = False
-        retry = True
-        num_retries = 0
+        _LOGGER.debug(f"sendData {str(data)}")
 
-        if self.socket is None:
+        if self.protocol is None:
             _LOGGER.debug(f"We are not ready yet to sendData")
             return False
 
-        # while retry:
         try:
-            self.socket.sendall(data)
-            # retry = False
+            self.protocol.write(data)
+            self.bytesSent += len(data)
+            self.recordFrame(SENT, data)
             return True
-        except socket.error as e:
+        except (OSError, ConnectionError) as e:
             _LOGGER.error(f"Dobiss socket error on sending data {str(e)}")
             await self.reconnect(data)
-            # num_retries += 1
-            # if num_retries >= MAX_NUM_RETRIES:
-            #     return False
-            # time.sleep(RETRY_DELAY)  # Introduce a delay between retries # HA does not allow this
-        # return False
 
     async def reconnect(self, data):
         _LOGGER.info(f"Dobiss for the reconnect")
         self.disconnect()
-        await self.connect()
+        # Called from jobs, so one attempt (see ensureConnected)
+        await self.connect(attempts=1)
         if data:
             await self.sendData(data)
 
-    def receiveResponse(self, sentDataSize, responseSize):
-        """Receive response"""
+    async def receiveResponse(self, sentData, responseSize):
+        """Receive the response to the request sentData.
 
-        # Receive until we have enough data
-        # The data consists of the sent data (padded to 32 bytes) and then the response data (padded to 32 bytes)
+           The controller first echoes the request, padded to 32 bytes, and then sends the
+           response data, padded to 32 bytes. If the echo is not at the start of the buffer
+           (e.g., after a dropped byte or a late response to an earlier request), we skip
+           ahead to where it is instead of reading a shifted response.
+        """
+        sentDataSize = len(sentData)
         sentDataPaddingSize = (32 - (sentDataSize % 32)) % 32
         responsePaddingSize = (32 - (responseSize % 32)) % 32
         totalSize = sentDataSize + sentDataPaddingSize + responseSize + responsePaddingSize
 
-        numRetries = 0
-
-        while (len(self.recvBuffer) < totalSize) and (numRetries < MAX_NUM_RETRIES) and self.socket is not None:
-            try:
-                received_data = self.socket.recv(RECV_SIZE)
-
-                if received_data:
-                    self.recvBuffer += received_data
-                    # print(f"Received from socket. Buffer is now length {len(self.recvBuffer)}")
-
-            except socket.error as e:
-                print(f"Dobiss socket error while receiving data: {str(e)}")
-                return []
+        if self.protocol is None:
+            return bytearray()
 
-        # We first receive the original packet back
-        # TODO Actually check the content
-        # original = self.recvBuffer[:sentDataSize]
-
-        # The actual response data
+        buffer = self.protocol.buffer
+        try:
+            await self.protocol.waitFor(sentDataSize, TIMEOUT)
+            if self.listening and buffer.peek(0, sentDataSize) != sentData and self.consumePush():
+                await self.protocol.waitFor(sentDataSize, TIMEOUT)
+            if buffer.peek(0, sentDataSize) != sentData:
+                self.misalignedFrames += 1
+                await self._resync(sentData)
+                self.resyncs += 1
+
+            # Receive until we have enough data
+            await self.protocol.waitFor(totalSize, TIMEOUT)
+        except asyncio.TimeoutError:
+            # A late response is skipped by the resync of the next request, unless the connection is dead
+            self.receiveFailures += 1
+            self._receiveTimeouts += 1
+            if len(buffer):
+                # Part of the response arrived
+                self.shortReads += 1
+            _LOGGER.error(f"Dobiss timeout while receiving data ({self._receiveTimeouts} in a row)")
+            if self._receiveTimeouts >= MAX_RECEIVE_TIMEOUTS:
+                self.disconnect()
+            return bytearray()
+        except ConnectionError as e:
+            self.receiveFailures += 1
+            _LOGGER.error(f"Dobiss error while receiving data: {str(e)}")
+            self.disconnect()
+            return bytearray()
+
+        self._receiveTimeouts = 0
+
+        # Whatever follows the response must be the start of the next frame; if not, a byte got lost
+        # inside the response and it is shifted. Keep the bytes after the echo for the next resync.
+        if responseSize > 0 and len(buffer) > totalSize and buffer.peek(totalSize, totalSize + 1)[0] != 0xAF:
+            self.misalignedFrames += 1
+            self.receiveFailures += 1
+            _LOGGER.warning("Dobiss response is shifted, dropping it")
+            buffer.consume(sentDataSize + sentDataPaddingSize)
+            return bytearray()
+
+        self.bytesReceived += totalSize
+
+        # The actual response data, as a view into the receive buffer
         responseData = bytearray()
         if responseSize > 0:
             start = sentDataSize + sentDataPaddingSize
             end = start + responseSize
-            responseData = self.recvBuffer[start:end]
+            responseData = buffer.peek(start, end)
 
-        # Remove the response from the buffer        
-        self.recvBuffer = self.recvBuffer[totalSize:]
+        # Remove the response from the buffer; the view stays valid until the next read
+        buffer.consume(totalSize)
 
         return responseData
 
-    async def importFullInstallation(self):
-        """Import the installation, all modules, their outputs and their status."""
+    async def _resync(self, sentData):
+        """Drop received bytes until the buffer starts with the echo of sentData.
+           Raises asyncio.TimeoutError if the echo does not show up in time.
+        """
+        buffer = self.protocol.buffer
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + TIMEOUT
+
+        offset = buffer.find(sentData)
+        while offset < 0:
+            # Only keep the tail that could be the start of the echo
+            buffer.consume(max(0, len(buffer) - len(sentData) + 1))
+            await self.protocol.waitFor(len(buffer) + 1, deadline - loop.time())
+            offset = buffer.find(sentData)
+
+        _LOGGER.warning(f"Dobiss stream misaligned, skipped {offset} bytes to resynchronize")
+        buffer.consume(offset)
+        await self.protocol.waitFor(len(sentData), deadline - loop.time())
+
+    async def importFullInstallation(self, progress=None):
+        """Import the installation, all modules, their outputs and their status from scratch.
+           Returns True if everything was imported.
+        """
+        return (await self.syncInstallation(True, progress, forget=True)).complete
+
+    async def syncInstallation(self, full=False, progress=None, forget=False):
+        """Import the installation again and bring the modules and outputs up to date.
+
+           The installation bitmap and all module records are requested (they are small), but
+           only the output tables of modules that were added or whose record changed are
+           downloaded, or those of all modules if full. Modules that do not answer keep what
+           we knew of them, so a timeout never removes outputs.
+
+           The module records and output tables are requested in pipelined background jobs
+           of IMPORT_CHUNK_SIZE requests, so commands are not held up by an import.
+           progress(modulesDone, moduleCount, bytesReceived) is called after each job of output tables.
+           With forget, nothing we knew is kept (see importFullInstallation).
+
+           The modules and outputs are imported into new containers that replace the current
+           ones at once at the end, so polls and entities running in between never see a
+           partial installation.
+           Returns the InstallationChanges.
+        """
+        previousModules = {} if forget else self.modules
+        previousOutputs = OutputRegistry() if forget else self.outputs
+        startBytes = self.bytesReceived
 
         # Import installation
-        await self.importInstallation()
+        if not await self.submit(Priority.Import, self.importInstallation):
+            return InstallationChanges(False, [], [], [])
 
         # Import modules
+        imported = {}
+        complete = await self.importRequests(
+            [self.moduleImport(moduleAddr, imported) for moduleAddr in self.availableModules])
+        modules = {}
         for moduleAddr in self.availableModules:
-            await self.importModule(moduleAddr)
+            if moduleAddr in imported:
+                modules[moduleAddr] = imported[moduleAddr]
+            elif moduleAddr in previousModules:
+                modules[moduleAddr] = previousModules[moduleAddr]
+
+        # Outputs of the modules that are new or changed
+        outputs = OutputRegistry(output for output in previousOutputs if output.moduleAddress in modules)
+        changedModules = [
+            module for moduleAddr, module in modules.items()
+            if full or previousModules.get(moduleAddr) != module
+        ]
+        for i in range(0, len(changedModules), IMPORT_CHUNK_SIZE):
+            chunk = changedModules[i:i + IMPORT_CHUNK_SIZE]
+            complete &= await self.importRequests([
+                self.outputsImport(module['address'], module['type'], module['outputCount'], outputs)
+                for module in chunk
+            ])
+            if progress is not None:
+                progress(i + len(chunk), len(changedModules), self.bytesReceived - startBytes)
+
+        for moduleAddr in self.modules:
+            if moduleAddr not in modules:
+                _LOGGER.info(f"Dobiss module {moduleAddr} was removed")
+                self.values.remove(moduleAddr)
+        self.modules = modules
+        self.outputs = outputs
+
+        # Their current value
+        if changedModules:
+            await self.requestAllStatus([module['address'] for module in changedModules])
+
+        return InstallationChanges(complete, *outputs.changes(previousOutputs))
+
+    async def importRequests(self, requests):
+        """Run import requests (see moduleImport) as background jobs of IMPORT_CHUNK_SIZE requests.
+           Returns True if every request got a valid response.
+        """
+        complete = True
+        for i in range(0, len(requests), IMPORT_CHUNK_SIZE):
+            connectFailures = self.connectRetries
+            complete &= await self.submit(Priority.Import, self.importChunk, requests[i:i + IMPORT_CHUNK_SIZE])
+            if self.connectRetries != connectFailures:
+                # The controller cannot be reached; do not try again for every chunk
+                return False
+        return complete
+
+    async def importChunk(self, requests):
+        """Run import requests, pipelined when enabled. When the controller does not keep up,
+           the requests that were not answered are retried one at a time.
+           Returns True if every request got a valid response.
+        """
+        if self._pipelining() and len(requests) > 1:
+            answered = await self.requestPipelined(requests)
+            if answered == len(requests):
+                self._pipelineFailures = 0
+                return True
+
+            self._pipelineFailed()
+            requests = requests[answered:]
+
+        complete = True
+        for request in requests:
+            complete &= await self.requestPipelined([request]) == 1
+        return complete
+
+    async def requestPipelined(self, requests):
+        """Write the requests at once, then read the responses in order and pass them to their parser.
+           requests is a list of (frame, responseSize, parse) as made by moduleImport and outputsImport.
+           Returns the number of requests answered with a valid response, in order.
+        """
+        frames = [frame for frame, _, _ in requests]
 
-        # Outputs and their current value
-        for moduleAddr, module in self.modules.items():
-            await self.importOutputs(module['address'], module['type'], module['outputCount'])
-            await self.requestStatus(module['address'], module['type'], module['outputCount'])
+        start = time.monotonic()
+        if not await self.sendData(b"".join(frames)):
+            return 0
+
+        for answered, (frame, responseSize, parse) in enumerate(requests):
+            if not parse(await self.receiveResponse(frame, responseSize)):
+                return answered
+
+        self.timings.record('pipelinedImport', time.monotonic() - start)
+        return len(requests)
+
+    def _pipelining(self):
+        """True if requests are pipelined. Pipelining is tried again PIPELINE_RETRY_INTERVAL after it was
+           switched off, and switched off again by the next failure.
+        """
+        if not self.pipelined and self._pipelineRetryAt is not None and time.monotonic() >= self._pipelineRetryAt:
+            _LOGGER.info("Trying pipelined Dobiss requests again")
+            self.pipelined = True
+            self._pipelineRetryAt = None
+            self._pipelineFailures = MAX_PIPELINE_FAILURES - 1
+        return self.pipelined
+
+    def _pipelineFailed(self):
+        """Count a failed pipelined request and switch pipelining off for a while if the controller cannot keep up.
+           Failures on a lost connection do not count: they say nothing about pipelining, and the next
+           job reconnects.
+        """
+        if not self.connected:
+            return
+        self._pipelineFailures += 1
+        if self._pipelineFailures >= MAX_PIPELINE_FAILURES:
+            _LOGGER.warning("Dobiss controller cannot keep up with pipelined requests, sending them one at a time")
+            self.pipelined = False
+            self._pipelineRetryAt = time.monotonic() + PIPELINE_RETRY_INTERVAL
+
+    def exportInstallation(self):
+        """The imported installation as JSON-serializable data (see restoreInstallation)."""
+        return {
+            'availableModules': list(self.availableModules),
+            'modules': [
+                {**module, 'type': module['type'].value} for module in self.modules.values()
+            ],
+            'outputs': [output.asdict() for output in self.outputs],
+        }
+
+    def restoreInstallation(self, data):
+        """Restore an installation exported by exportInstallation without talking to the controller."""
+        modules = {}
+        for module in data['modules']:
+            modules[module['address']] = {**module, 'type': DobissSystem.ModuleType(module['type'])}
+
+        outputs = OutputRegistry(Output.fromdict(output) for output in data['outputs'])
+
+        self.availableModules = list(data['availableModules'])
+        self.modules = modules
+        self.outputs = outputs
 
     async def importInstallation(self):
         """Import the installation."""
-        data = bytearray.fromhex("AF 0B 00 00 30 00 10 01 10 FF FF FF FF FF FF AF")
+        data = codec.INSTALLATION_REQUEST
+        start = time.monotonic()
         await self.sendData(data)
 
-        installationData = self.receiveResponse(len(data), 16)
+        installationData = await self.receiveResponse(data, 16)
+        self.timings.record('installation', time.monotonic() - start)
 
         if len(installationData) != 16:
-            print(
+            _LOGGER.warning(
                 f"Invalid data received trying to import installation: received {len(installationData)} bytes instead of 16")
-            return
+            return False
 
         # Parse the installation
-        self.availableModules = []
+        self.availableModules = codec.decodeInstallation(installationData)
 
-        # First 11 bytes (bits 0-81) contain whether or not there is a module with the specific address (1-82)
-        for i in range(0, 82):
-            byteNum = int(i / 8)
-            bitNum = int(i % 8)
-            hasModule = (installationData[byteNum] >> bitNum) & 1
-            if hasModule:
-                channelAddr = i + 1
-                self.availableModules.append(channelAddr)
+        _LOGGER.debug(f"Available modules: {self.availableModules}")
+        return True
 
-        print("Available modules: " + str(self.availableModules))
+    ModuleType = codec.ModuleType
 
-    class ModuleType(IntEnum):
-        """The type of module."""
-        Relais = 0x08
-        Dimmer = 0x10
-        V0_10 = 0x18
+    def moduleImport(self, moduleAddr, modules=None):
+        """The import request of a module, as (frame, responseSize, parse) (see requestPipelined).
+           The module is stored in modules, self.modules by default.
+        """
+        return codec.moduleRequest(moduleAddr), 16, functools.partial(self.parseModule, modules=modules)
 
     async def importModule(self, moduleAddr):
         """Import a module."""
 
         # Import the module
-        # data = bytearray.fromhex("AF 10 FF " + chr(moduleAddr).encode('hex') + " 00 00 10 01 10 FF FF FF FF FF FF AF")
-        data = bytearray.fromhex("AF 10 FF " + f"{moduleAddr:02x}" + " 00 00 10 01 10 FF FF FF FF FF FF AF")
+        data = codec.moduleRequest(moduleAddr)
+        start = time.monotonic()
         await self.sendData(data)
 
-        moduleData = self.receiveResponse(len(data), 16)
+        moduleData = await self.receiveResponse(data, 16)
+        self.timings.record('module', time.monotonic() - start)
+
+        return self.parseModule(moduleData)
 
+    def parseModule(self, moduleData, modules=None):
+        """Cache a module from its import response, in modules (self.modules by default)."""
         if len(moduleData) != 16:
-            print(f"Invalid data received trying to import module: received {len(moduleData)} bytes instead of 16")
-            return
+            _LOGGER.warning(
+                f"Invalid data received trying to import module: received {len(moduleData)} bytes instead of 16")
+            return False
 
-        # moduleAddr = ord(moduleData[0])
-        # moduleType = ord(moduleData[14])
-        # master = ord(moduleData[2])
-        moduleAddr = moduleData[0]
-        moduleType = DobissSystem.ModuleType(moduleData[14])
-        master = moduleData[2]
-        masterLSB = master & 1
-        isMaster = (masterLSB == 1)
-
-        # 12 outputs for relais, 4 for dimmers
-        if moduleType == DobissSystem.ModuleType.Relais:
-            outputCount = 12
-        else:
-            outputCount = 4
+        module = codec.decodeModule(moduleData)
+        moduleAddr = module.address
 
         # Cache the module
-        self.modules[moduleAddr] = {
-            'address': moduleAddr,
-            'type': moduleType,
-            'isMaster': isMaster,
-            'outputCount': outputCount
-        }
+        if modules is None:
+            modules = self.modules
+        modules[moduleAddr] = module._asdict()
 
-        print(f"Module {moduleAddr} imported: " + str(self.modules[moduleAddr]))
+        _LOGGER.debug(f"Module {moduleAddr} imported: {modules[moduleAddr]}")
+        return True
 
-    class OutputType(IntEnum):
-        """The type of output."""
-        Light = 0x00
-        Plug = 0x01
-        Fan = 0x02
-        Up = 0x03
-        Down = 0x04
+    OutputType = codec.OutputType
+
+    def outputsImport(self, moduleAddr, moduleType, outputCount, outputs=None):
+        """The import request of the outputs of a module, as (frame, responseSize, parse) (see requestPipelined).
+           The outputs are stored in outputs, self.outputs by default.
+        """
+        return (codec.outputsRequest(moduleType, moduleAddr, outputCount), 32 * outputCount,
+                functools.partial(self.parseOutputs, moduleAddr, outputCount, outputs=outputs))
 
     async def importOutputs(self, moduleAddr, moduleType, outputCount):
         """Import the outputs of a module."""
 
         # Import the module
-        # data = bytearray.fromhex("AF 10 " + chr(moduleType).encode('hex') +  + chr(moduleAddr).encode('hex') + " 01 00 20 " + chr(outputCount).encode('hex') + " 20 FF FF FF FF FF FF AF")
-        data = bytearray.fromhex(
-            "AF 10 " + f"{moduleType.value:02x}" + f"{moduleAddr:02x}" + " 01 00 20 " + f"{outputCount:02x}" + " 20 FF FF FF FF FF FF AF")
+        data = codec.outputsRequest(moduleType, moduleAddr, outputCount)
+        start = time.monotonic()
         await self.sendData(data)
 
         # <module.outputCount> lines of 32 bytes
-        # Output names of 30 characters; convert byte array to string;
-        # data[30] = icon type (0=light, 1=plug, 2=fan, 3=up, 4=down); data[31] = group index
-        outputsData = self.receiveResponse(len(data), 32 * outputCount)
+        outputsData = await self.receiveResponse(data, 32 * outputCount)
+        self.timings.record('outputs', time.monotonic() - start)
 
+        return self.parseOutputs(moduleAddr, outputCount, outputsData)
+
+    def parseOutputs(self, moduleAddr, outputCount, outputsData, outputs=None):
+        """Cache the outputs of a module from its output name table in outputs (self.outputs by default),
+           replacing those we had.
+        """
         if len(outputsData) != 32 * outputCount:
-            print(
-                f"Invalid data received trying to import module: received {len(outputsData)} bytes instead of {32 * outputCount}")
-            return
+            _LOGGER.warning(
+                f"Invalid data received trying to import outputs: received {len(outputsData)} bytes instead of {32 * outputCount}")
+            return False
 
-        for outputIndex in range(0, outputCount):
-            line = outputsData[outputIndex * 32: (outputIndex + 1) * 32]
-            outputName = line[0:30].strip().decode()
-            outputType = DobissSystem.OutputType(line[30])
-            groupIndex = line[31]
+        if outputs is None:
+            outputs = self.outputs
+        outputs.removeModule(moduleAddr)
 
+        for record in codec.decodeOutputs(moduleAddr, outputsData, outputCount):
             # Cache the output
-            self.outputs.append({
-                'moduleAddress': moduleAddr,
-                'index': outputIndex,
-                'name': outputName,
-                'type': outputType,
-                'groupIndex': groupIndex
-            })
+            output = Output(*record)
+            outputs.add(output)
 
-            print(f"Output imported: " + str(self.outputs[len(self.outputs) - 1]))
+            _LOGGER.debug(f"Output imported: {output}")
+
+        return True
+
+    def parseStatus(self, moduleAddr, outputCount, statusData):
+        """Cache the output values of a module from its status response."""
+        if len(statusData) != 16:
+            _LOGGER.warning(
+                f"Invalid data received trying to read the status: received {len(statusData)} bytes instead of 16")
+            return False
+
+        # Cache the values
+        self.values.update(moduleAddr, codec.decodeStatus(statusData, outputCount))
+
+        # Confirm or roll back the values we expect after an action
+        if self.unconfirmed:
+            now = time.monotonic()
+            for (unconfirmedAddr, outputIndex), (expected, sentAt) in list(self.unconfirmed.items()):
+                if unconfirmedAddr != moduleAddr or outputIndex >= outputCount:
+                    continue
+                value = self.values.value(moduleAddr, outputIndex)
+                if expected == value:
+                    del self.unconfirmed[(moduleAddr, outputIndex)]
+                elif now - sentAt < CONFIRM_GRACE:
+                    self.values.set(moduleAddr, outputIndex, expected)
+                else:
+                    _LOGGER.debug(f"Output {moduleAddr}.{outputIndex} reports {value} instead of {expected}")
+                    del self.unconfirmed[(moduleAddr, outputIndex)]
+
+        return True
 
     async def requestStatus(self, moduleAddr, moduleType, outputCount):
         """Request the status of all outputs of a module."""
 
         # Request the status
-        data = bytearray.fromhex(
-            "AF 01 " + f"{moduleType.value:02x}" + f"{moduleAddr:02x}" + " 00 00 00 01 00 FF FF FF FF FF FF AF")
+        data = codec.statusRequest(moduleType, moduleAddr)
+        start = time.monotonic()
+        self._pendingStatus[moduleAddr] += 1
         await self.sendData(data)
 
-        statusData = self.receiveResponse(len(data), 16)
+        statusData = await self.receiveResponse(data, 16)
+        self.timings.record('status', time.monotonic() - start)
+        if statusData:
+            self._pendingStatus[moduleAddr] -= 1
 
-        if len(statusData) != 16:
-            print(f"Invalid data received trying to import module: received {len(statusData)} bytes instead of 16")
-            return
+        return self.parseStatus(moduleAddr, outputCount, statusData)
 
-        if not moduleAddr in self.values:
-            self.values[moduleAddr] = []
+    async def requestAllStatus(self, moduleAddrs=None):
+        """Request the status of all outputs of all modules (or only of the given module addresses).
+           The modules are polled in background jobs of POLL_CHUNK_SIZE modules (one module
+           when polling sequentially), so commands only wait for the chunk in progress.
+        """
 
-        for outputIndex in range(0, outputCount):
-            value = statusData[outputIndex]
+        if moduleAddrs is None:
+            modules = list(self.modules.values())
+        else:
+            modules = [self.modules[moduleAddr] for moduleAddr in moduleAddrs if moduleAddr in self.modules]
+        while modules:
+            chunkSize = POLL_CHUNK_SIZE if self._pipelining() else 1
+            connectFailures = self.connectRetries
+            await self.submit(Priority.Poll, self.pollModules, modules[:chunkSize])
+            if self.connectRetries != connectFailures:
+                # The controller cannot be reached; the next poll tries again
+                break
+            modules = modules[chunkSize:]
+
+    async def pollModules(self, modules):
+        """Request the status of the given modules.
+           Pipelines the requests when enabled, and falls back to one request at a time
+           when the controller cannot keep up.
+        """
 
-            # Cache the value
-            if len(self.values[moduleAddr]) <= outputIndex:
-                self.values[moduleAddr].append(value)
-            else:
-                self.values[moduleAddr][outputIndex] = value
+        if self._pipelining() and len(modules) > 1:
+            if await self.requestStatusPipelined(modules):
+                self._pipelineFailures = 0
+                return
 
-    async def requestAllStatus(self):
-        """Request the status of all outputs of all modules."""
+            self._pipelineFailed()
 
-        for moduleAddr, module in self.modules.items():
+        for module in modules:
             await self.requestStatus(module['address'], module['type'], module['outputCount'])
 
-    class Action(IntEnum):
-        """The type of action."""
-        TurnOff = 0x00
-        TurnOn = 0x01
-        Toggle = 0x02
+    async def requestStatusPipelined(self, modules):
+        """Write the status requests of the modules at once, then read the responses in order.
+           Returns False if a response is missing, in which case the values may be partially updated.
+        """
+        frames = [codec.statusRequest(module['type'], module['address']) for module in modules]
+
+        start = time.monotonic()
+        self._pendingStatus.update(module['address'] for module in modules)
+        if not await self.sendData(b"".join(frames)):
+            return False
+
+        # The controller answers the requests in order, each with its own padded echo and response
+        for module, frame in zip(modules, frames):
+            statusData = await self.receiveResponse(frame, 16)
+            if statusData:
+                self._pendingStatus[module['address']] -= 1
+            if not self.parseStatus(module['address'], module['outputCount'], statusData):
+                return False
 
-    async def setOn(self, moduleAddr, outputIndex, brightness=100):
-        """Switch an output on."""
+        self.timings.record('pipelinedStatus', time.monotonic() - start)
+        return True
+
+    Action = codec.Action
+
+    async def setOn(self, moduleAddr, outputIndex, brightness=100, transition=None):
+        """Switch an output on, dimming to brightness in transition seconds if given."""
         _LOGGER.debug("setOn")
         action = DobissSystem.Action.TurnOn
-        await self.sendAction(moduleAddr, outputIndex, action, brightness)
+        await self.dim(moduleAddr, outputIndex, action, brightness, transition)
 
-    async def setOff(self, moduleAddr, outputIndex):
-        """Switch an output off."""
+    async def setOff(self, moduleAddr, outputIndex, transition=None):
+        """Switch an output off, dimming down in transition seconds if given."""
         _LOGGER.debug("setOff")
         action = DobissSystem.Action.TurnOff
-        await self.sendAction(moduleAddr, outputIndex, action)
+        await self.dim(moduleAddr, outputIndex, action, 100, transition)
 
     async def toggle(self, moduleAddr, outputIndex):
         """Toggle an output."""
         _LOGGER.debug("toggle")
         action = DobissSystem.Action.Toggle
+        self._cancelFade(moduleAddr, outputIndex)
         await self.sendAction(moduleAddr, outputIndex, action)
 
+    async def dim(self, moduleAddr, outputIndex, action, value, transition=None):
+        """Send a TurnOn or TurnOff action that the module carries out in transition seconds (soft dim).
+           A transition longer than MAX_SOFT_DIM is split in equal steps toward the target, each
+           one soft dim; the first is sent right away and the others in the background. Any
+           newer action on the output cancels the remaining steps.
+        """
+        self._cancelFade(moduleAddr, outputIndex)
+        if transition is None or transition <= codec.MAX_SOFT_DIM:
+            await self.sendAction(moduleAddr, outputIndex, action, value, softDim=codec.softDimByte(transition))
+            return
+
+        steps = math.ceil(transition / codec.MAX_SOFT_DIM)
+        stepTime = transition / steps
+        start = self.values.value(moduleAddr, outputIndex) or 0
+        target = value if action == DobissSystem.Action.TurnOn else 0
+        levels = [round(start + (target - start) * step / steps) for step in range(1, steps + 1)]
+        _LOGGER.debug(f"Dimming {moduleAddr}.{outputIndex} from {start} to {target} in {steps} steps of {stepTime}s")
+
+        await self.sendAction(moduleAddr, outputIndex, DobissSystem.Action.TurnOn, levels[0],
+                              softDim=codec.softDimByte(stepTime))
+        self._fades[(moduleAddr, outputIndex)] = asyncio.get_running_loop().create_task(
+            self._fadeSteps(moduleAddr, outputIndex, action, value, levels[1:], stepTime))
+
+    async def _fadeSteps(self, moduleAddr, outputIndex, action, value, levels, stepTime):
+        try:
+            for level in levels[:-1]:
+                await asyncio.sleep(stepTime)
+                await self.sendAction(moduleAddr, outputIndex, DobissSystem.Action.TurnOn, level,
+                                      softDim=codec.softDimByte(stepTime))
+            # The last step is the requested action itself
+            await asyncio.sleep(stepTime)
+            await self.sendAction(moduleAddr, outputIndex, action, value, softDim=codec.softDimByte(stepTime))
+        finally:
+            if self._fades.get((moduleAddr, outputIndex)) is asyncio.current_task():
+                del self._fades[(moduleAddr, outputIndex)]
+
+    def _cancelFade(self, moduleAddr, outputIndex):
+        task = self._fades.pop((moduleAddr, outputIndex), None)
+        if task is not None:
+            task.cancel()
+
     async def sendAction(self, moduleAddr, outputIndex, action, value=100, delayOn=0xFF, delayOff=0xFF, softDim=0xFF,
                    red=0xFF):
         """Generic method to send an action to an output.
-        Ensures connection is available for the duration of the command and
-        releases it afterwards if we established it here.
+        Actions sent at the same time (e.g., by a scene or a group) are batched into one burst,
+        which runs ahead of any queued poll or import request.
         """
         _LOGGER.debug("sendAction")
-        established_here = False
-        if not self.connected:
-            await self.connect()
-            established_here = True
-        try:
-            # Send the request header
-            headerData = bytearray.fromhex("AF 02 FF " + f"{moduleAddr:02x}" + " 00 00 08 01 08 FF FF FF FF FF FF AF")
-            await self.sendData(headerData)
+        record = codec.actionRecord(moduleAddr, outputIndex, action, value, delayOn, delayOff, softDim, red)
+
+        if self._pendingActions is None:
+            self._pendingActions = []
+            self._pendingFlush = asyncio.get_running_loop().create_task(self._flushActions())
+        self._pendingActions.append(record)
+
+        # Shielded: one caller giving up must not cancel the batch of the others
+        await asyncio.shield(self._pendingFlush)
+
+    async def _flushActions(self):
+        # Give the other actions of this burst the chance to join the batch
+        await asyncio.sleep(0)
+        records = self._pendingActions
+        self._pendingActions = None
+        await self.submit(Priority.Command, self._sendRecords, records)
+
+    async def sendActions(self, actions):
+        """Send a batch of actions on one connection.
+           actions is a list of (moduleAddr, outputIndex, action) or (moduleAddr, outputIndex, action, value) tuples.
+           Records are grouped per module and packed up to MAX_ACTIONS_PER_FRAME per frame.
+        """
+        _LOGGER.debug(f"sendActions {len(actions)}")
+        records = [codec.actionRecord(*action) for action in actions]
+        await self.submit(Priority.Command, self._sendRecords, records)
+
+    async def _sendRecords(self, records):
+        # Group per module, keeping the order of the actions within a module
+        modules = {}
+        for record in records:
+            modules.setdefault(record[0], []).append(record)
+
+        now = time.monotonic()
+        for moduleAddr in modules:
+            self.lastActions[moduleAddr] = now
+
+        for moduleAddr, moduleRecords in modules.items():
+            for i in range(0, len(moduleRecords), MAX_ACTIONS_PER_FRAME):
+                frameRecords = moduleRecords[i:i + MAX_ACTIONS_PER_FRAME]
+                if await self._sendFrameActions(moduleAddr, frameRecords):
+                    self._writeThrough(frameRecords, now)
+
+    def _writeThrough(self, records, now):
+        """Set the values we expect after the actions, until a poll confirms them."""
+        for moduleAddr, outputIndex, action, _, _, value, softDim, _ in records:
+            current = self.values.value(moduleAddr, outputIndex)
+            if current is None:
+                continue
+
+            isRelay = self.modules.get(moduleAddr, {}).get('type') == DobissSystem.ModuleType.Relais
+            if action == DobissSystem.Action.TurnOff or (action == DobissSystem.Action.Toggle and current):
+                expected = 0
+            elif isRelay or action == DobissSystem.Action.Toggle:
+                expected = 100
+            else:
+                expected = value
 
-            # Note: no additional data is sent back
-            self.receiveResponse(len(headerData), 0)
+            self.values.set(moduleAddr, outputIndex, expected)
+            # Polls during a soft dim report the values on the way
+            self.unconfirmed[(moduleAddr, outputIndex)] = (expected, now + codec.softDimSeconds(softDim))
 
-            # Send the request data
-            requestData = bytes((moduleAddr, outputIndex, action.value, delayOn, delayOff, int(value), softDim, red))
-            await self.sendData(requestData)
+    async def _sendFrameActions(self, moduleAddr, records):
+        """Send one frame of action records. Returns False if a response did not arrive."""
+        failures = self.receiveFailures
+        start = time.monotonic()
 
-            # Note: no additional data is sent back
-            self.receiveResponse(len(requestData), 0)
-        finally:
-            if established_here:
-                self.disconnect()
+        # Send the request header
+        headerData = codec.actionHeader(moduleAddr, len(records))
+        await self.sendData(headerData)
+
+        # Note: no additional data is sent back
+        await self.receiveResponse(headerData, 0)
+
+        # Send the request data
+        requestData = b"".join(records)
+        await self.sendData(requestData)
+
+        # Note: no additional data is sent back
+        await self.receiveResponse(requestData, 0)
+
+        self.timings.record('action', time.monotonic() - start)
+        return self.receiveFailures == failures
@@ -0,0 +1,49 @@
+"""Dobiss entities that follow the installation when it is imported again."""
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+
+from .const import DOMAIN
+
+
+def signalInstallationChanged(entryId):
+    """The dispatcher signal sent when a re-import changed the outputs of a config entry."""
+    return f"{DOMAIN}_{entryId}_installation_changed"
+
+
+def setupEntities(hass, config_entry, async_add_entities, domain, describe, create):
+    """Add an entity per description, and add, replace or remove entities when the installation changes.
+
+    describe() returns {id: description} for the current installation, where id is what the
+    entity passes to coordinator.uniqueId. create(description) makes the entity.
+    """
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    descriptions = describe()
+    entities = {id: create(description) for id, description in descriptions.items()}
+    async_add_entities(entities.values())
+
+    async def installationChanged():
+        nonlocal descriptions
+        current = describe()
+        registry = er.async_get(hass)
+
+        for id, description in descriptions.items():
+            if id not in current:
+                # Removing the registry entry removes the entity too
+                entity = entities.pop(id)
+                entityId = registry.async_get_entity_id(domain, DOMAIN, coordinator.uniqueId(id))
+                if entityId is not None:
+                    registry.async_remove(entityId)
+                else:
+                    await entity.async_remove()
+            elif current[id] != description:
+                # Renamed: replace the entity but keep its registry entry, so the entity id stays
+                await entities.pop(id).async_remove()
+
+        added = {id: create(description) for id, description in current.items() if id not in entities}
+        entities.update(added)
+        descriptions = current
+        if added:
+            async_add_entities(added.values())
+
+    config_entry.async_on_unload(
+        async_dispatcher_connect(hass, signalInstallationChanged(config_entry.entry_id), installationChanged))
@@ -1,9 +1,11 @@
 """Dobiss Fan Control"""
 import logging
-from .dobiss import DobissSystem
+from . import status
 from .const import DOMAIN
+from .entity import setupEntities
 
 from homeassistant.components.fan import FanEntity
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 
@@ -12,17 +14,15 @@ _LOGGER = logging.getLogger(__name__)
         
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Setup the Dobiss Fan platform."""
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
-    fans = coordinator.dobiss.fans
     _LOGGER.info("Adding fans...")
-    _LOGGER.debug(str(fans))
 
-    # Add devices
-    async_add_entities(
-        HomeAssistantDobissFan(coordinator, fan) for fan in fans
-    )
-    
+    # Add devices, and keep them in sync with re-imports of the installation
+    setupEntities(hass, config_entry, async_add_entities, "fan",
+                  lambda: {fan.id: fan for fan in coordinator.dobiss.fans},
+                  lambda fan: HomeAssistantDobissFan(coordinator, fan))
+
     _LOGGER.info("Dobiss fans added.")
 
 
@@ -36,17 +36,24 @@ class HomeAssistantDobissFan(CoordinatorEntity, FanEntity):
         """Initialize a DobissFan."""
         self.dobiss = coordinator.dobiss
         self._fan = fan
-        self._name = fan['name']
+        self._offset = status.offset(fan.moduleAddress, fan.index)
+        self._name = fan.name
+
 
+    @callback
+    def _handle_coordinator_update(self):
+        """Only write the state if the output changed in the last update."""
+        if self.coordinator.hasChanged(self._fan.moduleAddress, self._fan.index):
+            self.async_write_ha_state()
 
     @property
     def unique_id(self):
-        return "{}.{}".format(self._fan['moduleAddress'], self._fan['index'])
+        return self.coordinator.uniqueId(self._fan.id)
 
     @property
     def device_extra_attributes(self):
         """Return device specific state attributes."""
-        return self._fan
+        return self._fan.asdict()
     
     @property
     def name(self):
@@ -68,25 +75,23 @@ class HomeAssistantDobissFan(CoordinatorEntity, FanEntity):
     @property
     def is_on(self):
         """Return true if the fan is on."""
-        mod = self._fan['moduleAddress']
-        idx = self._fan['index']
-        mod_vals = self.coordinator.data.get(mod)
-        if not mod_vals or idx >= len(mod_vals):
-            return False
-        val = mod_vals[idx]
+        val = self.coordinator.data[self._offset]
+        # Unknown until the first poll
+        if val is None:
+            return None
         return val > 0
 
     async def async_turn_on(self, **kwargs):
         """Instruct the fan to turn on.
         """
-        await self.dobiss.setOn(self._fan['moduleAddress'], self._fan['index'])
+        await self.dobiss.setOn(self._fan.moduleAddress, self._fan.index)
 
-        # Poll states
-        await self.coordinator.async_request_refresh()
+        # Show the expected state right away; the next poll confirms it
+        self.coordinator.commandSent(self._fan.moduleAddress)
 
     async def async_turn_off(self, **kwargs):
         """Instruct the fan to turn off."""
-        await self.dobiss.setOff(self._fan['moduleAddress'], self._fan['index'])
+        await self.dobiss.setOff(self._fan.moduleAddress, self._fan.index)
 
-        # Poll states
-        await self.coordinator.async_request_refresh()
+        # Show the expected state right away; the next poll confirms it
+        self.coordinator.commandSent(self._fan.moduleAddress)
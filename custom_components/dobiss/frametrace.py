@@ -0,0 +1,108 @@
+"""
+Bounded trace and binary capture of the raw bytes exchanged with the Dobiss controller.
+"""
+
+import queue
+import struct
+import threading
+import time
+from collections import deque
+
+TRACE_SIZE = 256  # Number of sends and receives kept
+
+SENT = "tx"
+RECEIVED = "rx"
+
+# Capture file: the magic, followed by records of a direction byte (0=sent, 1=received),
+# the monotonic timestamp as a double, the payload length and the payload
+CAPTURE_MAGIC = b"DOBISSCAP1\n"
+_CAPTURE_RECORD = struct.Struct(">BdI")
+_DIRECTIONS = {SENT: 0, RECEIVED: 1}
+
+
+class FrameTrace:
+    """The last maxlen sends and receives with their timestamps.
+       Recording appends a tuple to a bounded deque, cheap enough to leave enabled.
+    """
+
+    def __init__(self, maxlen=TRACE_SIZE):
+        self._entries = deque(maxlen=maxlen)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def record(self, direction, data):
+        # Received data is a view into the receive buffer, which gets overwritten
+        self._entries.append((time.time(), direction, bytes(data)))
+
+    def clear(self):
+        self._entries.clear()
+
+    def asdict(self):
+        """The trace as JSON-serializable data, oldest first."""
+        return [
+            {'time': timestamp, 'direction': direction, 'data': data.hex(' ')}
+            for timestamp, direction, data in self._entries
+        ]
+
+
+class FrameCapture:
+    """Streams every send and receive to a compact binary file (see readCapture).
+       Recording only queues the packed record; a writer thread does the file I/O, so the event loop
+       never waits on the disk. Open and close block, so run them in the executor.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.records = 0
+        self._closed = False
+        self._file = open(path, "wb")
+        self._file.write(CAPTURE_MAGIC)
+        self._queue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write, name=f"Dobiss capture {path}", daemon=True)
+        self._writer.start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def record(self, direction, data):
+        if self._closed:
+            return
+        # Received data is a view into the receive buffer, which gets overwritten, so pack a copy
+        self._queue.put(_CAPTURE_RECORD.pack(_DIRECTIONS[direction], time.monotonic(), len(data)) + bytes(data))
+        self.records += 1
+
+    def _write(self):
+        with self._file:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                self._file.write(record)
+
+    def close(self):
+        """Write the queued records and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+
+def readCapture(path):
+    """The (direction, timestamp, data) records of a capture file, in order."""
+    directions = {value: direction for direction, value in _DIRECTIONS.items()}
+    with open(path, "rb") as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a Dobiss capture")
+        while True:
+            header = f.read(_CAPTURE_RECORD.size)
+            if len(header) < _CAPTURE_RECORD.size:
+                # A capture cut off while writing keeps its complete records
+                return
+            direction, timestamp, size = _CAPTURE_RECORD.unpack(header)
+            data = f.read(size)
+            if len(data) < size:
+                return
+            yield directions[direction], timestamp, data
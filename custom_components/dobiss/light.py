@@ -1,11 +1,15 @@
 """Dobiss Light Control"""
 import logging
 # import voluptuous as vol
+from . import status
 from .dobiss import DobissSystem
 from .const import DOMAIN
+from .entity import setupEntities
 # import asyncio
 
-from homeassistant.components.light import ColorMode, ATTR_BRIGHTNESS, LightEntity, LightEntityFeature
+from homeassistant.core import callback
+from homeassistant.components.light import ColorMode, ATTR_BRIGHTNESS, ATTR_TRANSITION, LightEntity, \
+    LightEntityFeature
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -13,16 +17,14 @@ _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Set up the Dobiss Light platform."""
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
-    lights = coordinator.dobiss.lights
     _LOGGER.info("Adding lights...")
-    _LOGGER.debug(str(lights))
 
-    # Add devices
-    async_add_entities(
-        HomeAssistantDobissLight(coordinator, light) for light in lights
-    )
+    # Add devices, and keep them in sync with re-imports of the installation
+    setupEntities(hass, config_entry, async_add_entities, "light",
+                  lambda: {light.id: light for light in coordinator.dobiss.lights},
+                  lambda light: HomeAssistantDobissLight(coordinator, light))
 
     _LOGGER.info("Dobiss lights added.")
 
@@ -37,22 +39,41 @@ class HomeAssistantDobissLight(CoordinatorEntity, LightEntity):
         """Initialize a DobissLight."""
         self.dobiss = coordinator.dobiss
         self._light = light
-        self._name = light['name']
+        self._offset = status.offset(light.moduleAddress, light.index)
+        self._name = light.name
+        self._relay = False
+
+    @property
+    def _is_relay(self):
+        """Whether the light is on a relay module, as last known while its module is being re-imported."""
+        module = self.dobiss.modules.get(self._light.moduleAddress)
+        if module is not None:
+            self._relay = module['type'] == DobissSystem.ModuleType.Relais
+        return self._relay
 
     @property
     def supported_features(self):
         # Brightness is not a feature flag in HA; it is declared via supported_color_modes
         # Only expose valid feature flags here.
+        if self._is_relay:
+            return LightEntityFeature.FLASH
+        # Dimmers fade by themselves (soft dim), so a transition costs one command
         return LightEntityFeature.FLASH | LightEntityFeature.TRANSITION
 
+    @callback
+    def _handle_coordinator_update(self):
+        """Only write the state if the output changed in the last update."""
+        if self.coordinator.hasChanged(self._light.moduleAddress, self._light.index):
+            self.async_write_ha_state()
+
     @property
     def unique_id(self):
-        return f"{self._light['moduleAddress']}.{self._light['index']}"
+        return self.coordinator.uniqueId(self._light.id)
 
     @property
     def device_extra_attributes(self):
         """Return device specific state attributes."""
-        return self._light
+        return self._light.asdict()
 
     @property
     def name(self):
@@ -78,23 +99,18 @@ class HomeAssistantDobissLight(CoordinatorEntity, LightEntity):
         This method is optional. Removing it indicates to Home Assistant
         that brightness is not supported for this light.
         """
-        mod = self._light['moduleAddress']
-        idx = self._light['index']
-        mod_vals = self.coordinator.data.get(mod)
-        if not mod_vals or idx >= len(mod_vals):
-            return 0
-        val = mod_vals[idx]
+        val = self.coordinator.data[self._offset]
+        if val is None:
+            return None
         return int(val * 255 / 100)
 
     @property
     def is_on(self):
         """Return true if light is on."""
-        mod = self._light['moduleAddress']
-        idx = self._light['index']
-        mod_vals = self.coordinator.data.get(mod)
-        if not mod_vals or idx >= len(mod_vals):
-            return False
-        val = mod_vals[idx]
+        val = self.coordinator.data[self._offset]
+        # Unknown until the first poll
+        if val is None:
+            return None
         return val > 0
 
     async def async_turn_on(self, **kwargs):
@@ -104,30 +120,28 @@ class HomeAssistantDobissLight(CoordinatorEntity, LightEntity):
         brightness control.
         """
         _LOGGER.debug("async_turn_on")
-        is_relay = self.dobiss.modules[self._light['moduleAddress']]['type'] == DobissSystem.ModuleType.Relais
-        if is_relay:
+        if self._is_relay:
             # Relays are on/off only; always turn on to 100%
-            await self.dobiss.setOn(self._light['moduleAddress'], self._light['index'], 100)
+            await self.dobiss.setOn(self._light.moduleAddress, self._light.index, 100)
         else:
             pct = int(kwargs.get(ATTR_BRIGHTNESS, 255) * 100 / 255)
-            await self.dobiss.setOn(self._light['moduleAddress'], self._light['index'], pct)
-        await self.coordinator.async_request_refresh()
+            await self.dobiss.setOn(self._light.moduleAddress, self._light.index, pct, kwargs.get(ATTR_TRANSITION))
+        self.coordinator.commandSent(self._light.moduleAddress)
 
     @property
     def supported_color_modes(self):
-        is_relay = self.dobiss.modules[self._light['moduleAddress']]['type'] == DobissSystem.ModuleType.Relais
-        if is_relay:
+        if self._is_relay:
             return {ColorMode.ONOFF}
         # Dimmer: expose brightness support
         return {ColorMode.BRIGHTNESS}
 
     @property
     def color_mode(self):
-        is_relay = self.dobiss.modules[self._light['moduleAddress']]['type'] == DobissSystem.ModuleType.Relais
-        return ColorMode.ONOFF if is_relay else ColorMode.BRIGHTNESS
+        return ColorMode.ONOFF if self._is_relay else ColorMode.BRIGHTNESS
 
     async def async_turn_off(self, **kwargs):
         """Instruct the light to turn off."""
         _LOGGER.debug("async_turn_off")
-        await self.dobiss.setOff(self._light['moduleAddress'], self._light['index'])
-        await self.coordinator.async_request_refresh()
+        transition = None if self._is_relay else kwargs.get(ATTR_TRANSITION)
+        await self.dobiss.setOff(self._light.moduleAddress, self._light.index, transition)
+        self.coordinator.commandSent(self._light.moduleAddress)
@@ -0,0 +1,70 @@
+"""
+Adaptive, per-module polling schedule for the Dobiss integration.
+"""
+
+ACTIVE_WINDOW = 30  # Seconds a module keeps being polled fast after activity
+DECAY = 1.5  # Factor by which the interval of a quiet module grows after each poll
+
+
+class AdaptiveSchedule:
+    """Per-module poll intervals that drop to minInterval on activity and decay
+       toward maxInterval while a module stays quiet.
+    """
+
+    def __init__(self, minInterval, maxInterval, activeWindow=ACTIVE_WINDOW, decay=DECAY):
+        self.minInterval = minInterval
+        self.maxInterval = max(minInterval, maxInterval)
+        self.activeWindow = activeWindow
+        self.decay = decay
+
+        # moduleAddress -> [interval, lastPoll, activeUntil]
+        self._modules = {}
+
+    def _state(self, moduleAddr):
+        if moduleAddr not in self._modules:
+            self._modules[moduleAddr] = [self.minInterval, None, 0.0]
+        return self._modules[moduleAddr]
+
+    @property
+    def intervals(self):
+        """The current poll interval in seconds per module."""
+        return {moduleAddr: state[0] for moduleAddr, state in self._modules.items()}
+
+    def activity(self, moduleAddr, when):
+        """A change was seen or a command was sent to the module at monotonic time when."""
+        state = self._state(moduleAddr)
+        activeUntil = when + self.activeWindow
+        if activeUntil > state[2]:
+            state[0] = self.minInterval
+            state[2] = activeUntil
+
+    def polled(self, moduleAddr, changed, now):
+        """Register a poll of the module and whether any of its outputs changed."""
+        state = self._state(moduleAddr)
+        state[1] = now
+        if changed:
+            self.activity(moduleAddr, now)
+        elif now >= state[2]:
+            state[0] = min(state[0] * self.decay, self.maxInterval)
+
+    def due(self, moduleAddrs, now):
+        """The modules that must be polled now. Modules never polled before are always due."""
+        result = []
+        for moduleAddr in moduleAddrs:
+            interval, lastPoll, _ = self._state(moduleAddr)
+            # Polls are scheduled for the earliest module, so allow a little slack for the others
+            if lastPoll is None or lastPoll + interval <= now + self.minInterval / 2:
+                result.append(moduleAddr)
+        return result
+
+    def nextPoll(self, moduleAddrs, now):
+        """Seconds until the next of the modules is due, never less than minInterval.
+           Only the given modules count, so modules that were removed do not keep polls coming.
+        """
+        delay = self.maxInterval
+        for moduleAddr in moduleAddrs:
+            interval, lastPoll, _ = self._state(moduleAddr)
+            if lastPoll is None:
+                return self.minInterval
+            delay = min(delay, lastPoll + interval - now)
+        return max(delay, self.minInterval)
@@ -0,0 +1,121 @@
+"""
+Indexed registry of the outputs of a Dobiss installation.
+"""
+
+import dataclasses
+
+try:
+    from .codec import MAX_OUTPUTS, OutputType
+except ImportError:  # Used as a standalone module (see test.py)
+    from codec import MAX_OUTPUTS, OutputType
+
+
+@dataclasses.dataclass(slots=True)
+class Output:
+    """An output as described in the output name table of its module."""
+    moduleAddress: int
+    index: int
+    name: str
+    type: OutputType
+    groupIndex: int
+
+    @property
+    def key(self):
+        return self.moduleAddress, self.index
+
+    @property
+    def id(self):
+        """The "<module>.<index>" id of the output, the base of its entity's unique id."""
+        return f"{self.moduleAddress}.{self.index}"
+
+    def asdict(self):
+        """The output as JSON-serializable data (see fromdict)."""
+        return {**dataclasses.asdict(self), 'type': self.type.value}
+
+    @classmethod
+    def fromdict(cls, data):
+        return cls(data['moduleAddress'], data['index'], data['name'], OutputType(data['type']), data['groupIndex'])
+
+
+class OutputRegistry:
+    """The outputs in import order, indexed by (moduleAddress, index), by type and by (moduleAddress, groupIndex).
+       Every index is a dict keyed by (moduleAddress, index), which keeps import order and makes adding and
+       removing an output O(1), so neither lookups nor re-imports scan the outputs.
+       The views handed out are the indexes themselves; do not hold on to them while modifying the registry.
+    """
+
+    __slots__ = ('_byKey', '_byType', '_byGroup')
+
+    def __init__(self, outputs=()):
+        self._byKey = {}
+        self._byType = {outputType: {} for outputType in OutputType}
+        self._byGroup = {}
+        for output in outputs:
+            self.add(output)
+
+    def __len__(self):
+        return len(self._byKey)
+
+    def __iter__(self):
+        return iter(self._byKey.values())
+
+    def __getitem__(self, position):
+        """The output(s) at a position in import order; this copies the outputs, so keep it out of hot paths."""
+        return list(self._byKey.values())[position]
+
+    def add(self, output):
+        if output.key in self._byKey:
+            # Replace the output, e.g. when the outputs of a module are imported again
+            self.remove(output.moduleAddress, output.index)
+        self._byKey[output.key] = output
+        self._byType[output.type][output.key] = output
+        self._byGroup.setdefault((output.moduleAddress, output.groupIndex), {})[output.key] = output
+
+    def remove(self, moduleAddr, index):
+        """Remove an output; returns it, or None if there is no such output."""
+        output = self._byKey.pop((moduleAddr, index), None)
+        if output is not None:
+            del self._byType[output.type][output.key]
+            groupKey = (output.moduleAddress, output.groupIndex)
+            group = self._byGroup[groupKey]
+            del group[output.key]
+            if not group:
+                del self._byGroup[groupKey]
+        return output
+
+    def removeModule(self, moduleAddr):
+        """Remove all outputs of a module."""
+        for index in range(MAX_OUTPUTS):
+            self.remove(moduleAddr, index)
+
+    def changes(self, previous):
+        """The outputs added, removed and changed since the previous registry, as three lists.
+           An output that changed type counts as removed and added.
+        """
+        added = []
+        changed = []
+        for output in self:
+            old = previous.get(output.moduleAddress, output.index)
+            if old is None or old.type != output.type:
+                added.append(output)
+            elif old != output:
+                changed.append(output)
+        removed = []
+        for output in previous:
+            current = self.get(output.moduleAddress, output.index)
+            if current is None or current.type != output.type:
+                removed.append(output)
+        return added, removed, changed
+
+    def get(self, moduleAddr, index):
+        """The output at index of module moduleAddr, or None."""
+        return self._byKey.get((moduleAddr, index))
+
+    def ofType(self, outputType):
+        """The outputs of a type, in import order."""
+        return self._byType[outputType].values()
+
+    def inGroup(self, moduleAddr, groupIndex):
+        """The outputs of a module with a group index, in import order."""
+        group = self._byGroup.get((moduleAddr, groupIndex))
+        return group.values() if group is not None else ()
@@ -0,0 +1,110 @@
+"""
+Prioritized single-writer I/O scheduler for the Dobiss connection.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from enum import IntEnum
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Priority class of a job; lower values run first."""
+    Command = 0
+    Poll = 1
+    Import = 2
+
+
+class DobissScheduler:
+    """Owns the connection by running one job at a time, the most urgent first.
+
+       A job is a coroutine function doing a complete request/response exchange, so
+       jobs never interleave their frames on the socket or consume each other's
+       responses. Long operations (full polls, imports) are submitted as several
+       small jobs, which lets user commands go in between them.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._worker = None
+
+        self._depth = {priority: 0 for priority in Priority}
+        self._jobs = {priority: 0 for priority in Priority}
+        self._totalWait = {priority: 0.0 for priority in Priority}
+        self._maxWait = {priority: 0.0 for priority in Priority}
+
+    @property
+    def stats(self):
+        """Queue depth and wait time (in seconds) per priority class."""
+        result = {}
+        for priority in Priority:
+            jobs = self._jobs[priority]
+            result[priority.name] = {
+                'depth': self._depth[priority],
+                'jobs': jobs,
+                'meanWait': self._totalWait[priority] / jobs if jobs else 0.0,
+                'maxWait': self._maxWait[priority],
+            }
+        return result
+
+    async def run(self, priority, job, *args):
+        """Queue job(*args) and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        # The sequence number keeps jobs of the same priority in FIFO order
+        self._queue.put_nowait((priority, next(self._sequence), time.monotonic(), job, args, future))
+        self._depth[priority] += 1
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._work())
+
+        return await future
+
+    def stop(self):
+        """Stop running jobs. Queued jobs are cancelled."""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+        while not self._queue.empty():
+            priority, _, _, _, _, future = self._queue.get_nowait()
+            self._depth[priority] -= 1
+            future.cancel()
+
+    async def _work(self):
+        while True:
+            priority, _, queuedAt, job, args, future = await self._queue.get()
+            self._depth[priority] -= 1
+
+            # The caller gave up waiting (e.g., the coordinator timed out)
+            if future.done():
+                continue
+
+            wait = time.monotonic() - queuedAt
+            self._jobs[priority] += 1
+            self._totalWait[priority] += wait
+            self._maxWait[priority] = max(self._maxWait[priority], wait)
+
+            # A caller that gives up cancels its job, so the job does not hold up the others
+            task = asyncio.get_running_loop().create_task(job(*args))
+            future.add_done_callback(lambda _, task=task: task.cancel())
+            try:
+                await asyncio.wait((task,))
+            except asyncio.CancelledError:
+                task.cancel()
+                if not future.done():
+                    future.cancel()
+                raise
+
+            if future.done():
+                continue
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                _LOGGER.debug(f"Dobiss {priority.name} job failed: {str(task.exception())}")
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
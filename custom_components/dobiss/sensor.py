@@ -0,0 +1,144 @@
+"""Dobiss connection diagnostics"""
+import logging
+from .const import DOMAIN, UPDATE_TIMEOUT
+
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.const import EntityCategory, PERCENTAGE, UnitOfInformation, UnitOfTime
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+# Timing histograms exposed as sensors: timing name -> sensor name
+TIMINGS = {
+    'poll': "Poll duration",
+    'connect': "Connect duration",
+    'status': "Status request duration",
+    'pipelinedStatus': "Pipelined status request duration",
+    'action': "Command duration",
+    'installation': "Installation request duration",
+    'module': "Module request duration",
+    'outputs': "Output table request duration",
+    'pipelinedImport': "Pipelined import request duration",
+}
+
+# Counters exposed as sensors: counter name -> (sensor name, unit)
+COUNTERS = {
+    'reconnects': ("Reconnects", None),
+    'connectRetries': ("Connect retries", None),
+    'receiveFailures': ("Receive failures", None),
+    'shortReads': ("Short reads", None),
+    'resyncs': ("Resyncs", None),
+    'bytesSent': ("Bytes sent", UnitOfInformation.BYTES),
+    'bytesReceived': ("Bytes received", UnitOfInformation.BYTES),
+    'pushFrames': ("Pushed status frames", None),
+}
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up the Dobiss diagnostic sensors."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+
+    sensors = [DobissTimingSensor(coordinator, timing, name) for timing, name in TIMINGS.items()]
+    sensors += [DobissCounterSensor(coordinator, counter, name, unit) for counter, (name, unit) in COUNTERS.items()]
+    sensors.append(DobissPollTimeoutSensor(coordinator))
+
+    async_add_entities(sensors)
+
+    _LOGGER.info("Dobiss diagnostic sensors added.")
+
+
+class DobissDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """A statistic of the connection to the Dobiss controller, disabled by default."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(self, coordinator, key, name):
+        super().__init__(coordinator)
+        self._key = key
+        self._name = name
+
+    @property
+    def dobiss(self):
+        # The DobissSystem is replaced when the host or port changes
+        return self.coordinator.dobiss
+
+    @property
+    def available(self):
+        # Statistics are most useful exactly when polling fails
+        return True
+
+    @property
+    def unique_id(self):
+        return self.coordinator.uniqueId(self._key)
+
+    @property
+    def name(self):
+        return f"Dobiss {self._name}"
+
+    @property
+    def device_info(self):
+        """Return device info to group all entities under the Dobiss controller."""
+        host = getattr(self.dobiss, 'host', 'dobiss')
+        port = getattr(self.dobiss, 'port', None)
+        ident = f"{host}:{port}" if port is not None else str(host)
+        return {
+            "identifiers": {(DOMAIN, ident)},
+            "name": f"Dobiss Controller {host}",
+            "manufacturer": "Dobiss",
+        }
+
+
+class DobissTimingSensor(DobissDiagnosticSensor):
+    """The last duration of a request type, with its distribution as attributes (in ms)."""
+
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 1
+
+    @property
+    def native_value(self):
+        if self._key not in self.dobiss.timings:
+            return None
+        return self.dobiss.timings[self._key].last * 1000
+
+    @property
+    def extra_state_attributes(self):
+        if self._key not in self.dobiss.timings:
+            return None
+        return self.dobiss.timings[self._key].asdict()
+
+
+class DobissCounterSensor(DobissDiagnosticSensor):
+    """A connection or traffic counter."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(self, coordinator, key, name, unit):
+        super().__init__(coordinator, key, name)
+        self._attr_native_unit_of_measurement = unit
+
+    @property
+    def native_value(self):
+        return self.dobiss.counters[self._key]
+
+
+class DobissPollTimeoutSensor(DobissDiagnosticSensor):
+    """How much of the update time-out the slowest poll used."""
+
+    _attr_native_unit_of_measurement = PERCENTAGE
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 0
+
+    def __init__(self, coordinator):
+        super().__init__(coordinator, 'pollTimeoutUsage', "Poll time-out usage")
+
+    @property
+    def native_value(self):
+        if 'poll' not in self.dobiss.timings:
+            return None
+        return min(100.0, self.dobiss.timings['poll'].max / UPDATE_TIMEOUT * 100)
+
+    @property
+    def extra_state_attributes(self):
+        return {'timeout': UPDATE_TIMEOUT}
@@ -0,0 +1,80 @@
+"""
+Lightweight timing statistics for the Dobiss connection.
+"""
+
+from bisect import bisect_left
+
+# Upper bounds (in seconds) of the histogram buckets: 1 ms doubling up to 16 s, then everything slower
+BUCKETS = tuple(0.001 * 2 ** i for i in range(15))
+
+
+class Histogram:
+    """Counts durations in fixed, exponentially growing buckets.
+       Recording is a bisect and a few additions, cheap enough for every request.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def record(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """The upper bound of the bucket holding the given fraction of the durations (never above the maximum)."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS[bucket], self.max) if bucket < len(BUCKETS) else self.max
+        return self.max
+
+    def asdict(self):
+        """The summary of the histogram in milliseconds."""
+        return {
+            'count': self.count,
+            'last': self.last * 1000 if self.last is not None else None,
+            'mean': self.mean * 1000,
+            'p50': self.percentile(0.50) * 1000,
+            'p95': self.percentile(0.95) * 1000,
+            'p99': self.percentile(0.99) * 1000,
+            'max': self.max * 1000,
+        }
+
+
+class Timings:
+    """Histograms by name, created on first use."""
+
+    def __init__(self):
+        self._histograms = {}
+
+    def __getitem__(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram()
+        return histogram
+
+    def __contains__(self, name):
+        return name in self._histograms
+
+    def record(self, name, seconds):
+        self[name].record(seconds)
+
+    def asdict(self):
+        """The summaries of all histograms in milliseconds."""
+        return {name: histogram.asdict() for name, histogram in self._histograms.items()}
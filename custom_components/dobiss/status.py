@@ -0,0 +1,133 @@
+"""
+Contiguous store of the output values of all modules of a Dobiss installation.
+"""
+
+try:
+    from .codec import MAX_MODULES, MAX_OUTPUTS
+except ImportError:  # Used as a standalone module (see test.py)
+    from codec import MAX_MODULES, MAX_OUTPUTS
+
+SIZE = MAX_MODULES * MAX_OUTPUTS
+
+
+def offset(moduleAddr, index):
+    """The position of an output in the store and its snapshots; entities compute it once."""
+    return (moduleAddr - 1) * MAX_OUTPUTS + index
+
+
+class StatusSnapshot:
+    """The output values at one point in time, e.g. the end of a poll. Never changes."""
+
+    __slots__ = ('version', 'data', 'counts')
+
+    def __init__(self, version=0, data=bytes(SIZE), counts=bytes(MAX_MODULES + 1)):
+        self.version = version
+        self.data = data
+        self.counts = counts
+
+    def __getitem__(self, position):
+        """The value at offset position, or None if the output was never polled (e.g., restored from cache)."""
+        moduleIndex, index = divmod(position, MAX_OUTPUTS)
+        if index >= self.counts[moduleIndex + 1]:
+            return None
+        return self.data[position]
+
+    def value(self, moduleAddr, index):
+        """The value of an output, or None if it was never polled."""
+        if index >= self.counts[moduleAddr]:
+            return None
+        return self.data[offset(moduleAddr, index)]
+
+    def modules(self):
+        """The addresses of the modules with values."""
+        return [moduleAddr for moduleAddr, count in enumerate(self.counts) if count]
+
+    def changes(self, previous):
+        """The outputs that differ from the previous snapshot: {(moduleAddr, index): (old, new)}.
+           Outputs without a previous value have None as old value.
+        """
+        if previous is not None and previous.data == self.data and previous.counts == self.counts:
+            return {}
+
+        changes = {}
+        for moduleAddr in self.modules():
+            start = offset(moduleAddr, 0)
+            count = self.counts[moduleAddr]
+            if previous is not None and previous.counts[moduleAddr] == count and \
+                    previous.data[start:start + count] == self.data[start:start + count]:
+                continue
+            for index in range(count):
+                old = previous.value(moduleAddr, index) if previous is not None else None
+                new = self.data[start + index]
+                if old != new:
+                    changes[(moduleAddr, index)] = (old, new)
+        return changes
+
+    def asdict(self):
+        """The values as {moduleAddr: [value, ...]}."""
+        return {
+            moduleAddr: list(self.data[offset(moduleAddr, 0):offset(moduleAddr, self.counts[moduleAddr])])
+            for moduleAddr in self.modules()
+        }
+
+
+class StatusStore:
+    """The output values (0-100) of all modules, MAX_OUTPUTS bytes per module address.
+
+       Status frames are copied in with a single slice assignment, so polling allocates
+       nothing. Readers get a StatusSnapshot (see snapshot) so they always see the values
+       of complete polls, not of a poll in progress.
+    """
+
+    __slots__ = ('_data', '_counts', 'version', '_snapshot')
+
+    def __init__(self):
+        self._data = bytearray(SIZE)
+        self._counts = bytearray(MAX_MODULES + 1)  # Outputs with a value per module address
+        self.version = 0
+        self._snapshot = StatusSnapshot()
+
+    def __contains__(self, moduleAddr):
+        return bool(self._counts[moduleAddr])
+
+    def update(self, moduleAddr, values):
+        """Copy the values of the first outputs of a module."""
+        count = len(values)
+        start = offset(moduleAddr, 0)
+        self._data[start:start + count] = values
+        if count > self._counts[moduleAddr]:
+            self._counts[moduleAddr] = count
+        self.version += 1
+
+    def value(self, moduleAddr, index):
+        """The value of an output, or None if it was never polled."""
+        if index >= self._counts[moduleAddr]:
+            return None
+        return self._data[offset(moduleAddr, index)]
+
+    def set(self, moduleAddr, index, value):
+        """Change the value of an output that was polled before."""
+        self._data[offset(moduleAddr, index)] = value
+        self.version += 1
+
+    def remove(self, moduleAddr):
+        """Forget the values of a module, e.g. when it is removed from the installation."""
+        start = offset(moduleAddr, 0)
+        self._data[start:start + MAX_OUTPUTS] = bytes(MAX_OUTPUTS)
+        self._counts[moduleAddr] = 0
+        self.version += 1
+
+    def clear(self):
+        self._data[:] = bytes(SIZE)
+        self._counts[:] = bytes(MAX_MODULES + 1)
+        self.version += 1
+
+    def snapshot(self):
+        """An immutable copy of the current values; only copied if they changed since the last snapshot."""
+        if self._snapshot.version != self.version:
+            self._snapshot = StatusSnapshot(self.version, bytes(self._data), bytes(self._counts))
+        return self._snapshot
+
+    def asdict(self):
+        """The values as {moduleAddr: [value, ...]}."""
+        return self.snapshot().asdict()
@@ -1,9 +1,11 @@
 """Dobiss Plug Control"""
 import logging
-from .dobiss import DobissSystem
+from . import status
 from .const import DOMAIN
+from .entity import setupEntities
 
 from homeassistant.components.switch import SwitchEntity, SwitchDeviceClass
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 
@@ -12,17 +14,15 @@ _LOGGER = logging.getLogger(__name__)
         
 async def async_setup_entry(hass, config_entry, async_add_entities):
     """Setup the Dobiss Plug platform."""
-    coordinator = hass.data[DOMAIN]["coordinator"]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
 
-    plugs = coordinator.dobiss.plugs
     _LOGGER.info("Adding plugs...")
-    _LOGGER.debug(str(plugs))
 
-    # Add devices
-    async_add_entities(
-        HomeAssistantDobissPlug(coordinator, plug) for plug in plugs
-    )
-    
+    # Add devices, and keep them in sync with re-imports of the installation
+    setupEntities(hass, config_entry, async_add_entities, "switch",
+                  lambda: {plug.id: plug for plug in coordinator.dobiss.plugs},
+                  lambda plug: HomeAssistantDobissPlug(coordinator, plug))
+
     _LOGGER.info("Dobiss plugs added.")
 
 
@@ -36,17 +36,24 @@ class HomeAssistantDobissPlug(CoordinatorEntity, SwitchEntity):
         """Initialize a DobissPlug."""
         self.dobiss = coordinator.dobiss
         self._plug = plug
-        self._name = plug['name']
+        self._offset = status.offset(plug.moduleAddress, plug.index)
+        self._name = plug.name
+
 
+    @callback
+    def _handle_coordinator_update(self):
+        """Only write the state if the output changed in the last update."""
+        if self.coordinator.hasChanged(self._plug.moduleAddress, self._plug.index):
+            self.async_write_ha_state()
 
     @property
     def unique_id(self):
-        return "{}.{}".format(self._plug['moduleAddress'], self._plug['index'])
+        return self.coordinator.uniqueId(self._plug.id)
 
     @property
     def device_extra_attributes(self):
         """Return device specific state attributes."""
-        return self._plug
+        return self._plug.asdict()
     
     @property
     def name(self):
@@ -73,25 +80,23 @@ class HomeAssistantDobissPlug(CoordinatorEntity, SwitchEntity):
     @property
     def is_on(self):
         """Return true if the plug is on."""
-        mod = self._plug['moduleAddress']
-        idx = self._plug['index']
-        mod_vals = self.coordinator.data.get(mod)
-        if not mod_vals or idx >= len(mod_vals):
-            return False
-        val = mod_vals[idx]
+        val = self.coordinator.data[self._offset]
+        # Unknown until the first poll
+        if val is None:
+            return None
         return val > 0
 
     async def async_turn_on(self, **kwargs):
         """Instruct the plug to switch on.
         """
-        await self.dobiss.setOn(self._plug['moduleAddress'], self._plug['index'])
+        await self.dobiss.setOn(self._plug.moduleAddress, self._plug.index)
 
-        # Poll states
-        await self.coordinator.async_request_refresh()
+        # Show the expected state right away; the next poll confirms it
+        self.coordinator.commandSent(self._plug.moduleAddress)
 
     async def async_turn_off(self, **kwargs):
         """Instruct the plug to turn off."""
-        await self.dobiss.setOff(self._plug['moduleAddress'], self._plug['index'])
+        await self.dobiss.setOff(self._plug.moduleAddress, self._plug.index)
 
-        # Poll states
-        await self.coordinator.async_request_refresh()
+        # Show the expected state right away; the next poll confirms it
+        self.coordinator.commandSent(self._plug.moduleAddress)
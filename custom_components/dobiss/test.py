@@ -19,13 +19,14 @@ async def main():
         port = int(sys.argv[2])
 
     d = dobiss.DobissSystem(ip, port)
+    await d.connect()
     await d.importFullInstallation()
     await d.requestAllStatus()
 
     while True:
-        time.sleep(1)
+        await asyncio.sleep(1)
         await d.requestAllStatus()
-        print(f"time: ", time.time(), " value: ", d.values)
+        print(f"time: ", time.time(), " value: ", d.values.asdict())
         # print(d.values)
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+"""
+Asyncio transport for the Dobiss LAN controller (DO5437).
+"""
+
+import asyncio
+import logging
+
+try:
+    from .frametrace import RECEIVED
+except ImportError:  # Used as a standalone module (see test.py)
+    from frametrace import RECEIVED
+
+RECV_SIZE = 1024  # Minimum free space offered to the transport for each read
+BUFFER_SIZE = 16 * 1024  # Initial receive buffer size; a full 82-module pipelined poll fits
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """Preallocated receive buffer.
+
+       The transport reads straight into its free space and frames are handed out as
+       memoryview slices, so receiving allocates nothing. Instead of wrapping around, the
+       unread bytes are moved back to the front when the free space runs out; this keeps
+       every frame contiguous. A slice is only valid until the next read, so parse it
+       before awaiting anything.
+    """
+
+    def __init__(self, size=BUFFER_SIZE):
+        self._data = bytearray(size)
+        self._view = memoryview(self._data)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def writable(self, sizeHint=RECV_SIZE):
+        """The free space to receive into, at least sizeHint bytes."""
+        sizeHint = max(sizeHint, RECV_SIZE)
+        if len(self._data) - self._end < sizeHint:
+            unread = self._end - self._start
+            if unread + sizeHint > len(self._data):
+                # Grow; only happens when the controller sends more than we expected at once
+                data = bytearray(max(2 * len(self._data), unread + sizeHint))
+                data[:unread] = self._view[self._start:self._end]
+                self._data = data
+                self._view = memoryview(data)
+            else:
+                self._view[:unread] = self._view[self._start:self._end]
+            self._start = 0
+            self._end = unread
+        return self._view[self._end:]
+
+    def written(self, size):
+        """size bytes were received into the free space."""
+        self._end += size
+
+    def peek(self, start, end):
+        """A view of the unread bytes start to end."""
+        return self._view[self._start + start:self._start + end]
+
+    def find(self, data):
+        """The position of data in the unread bytes, or -1."""
+        position = self._data.find(data, self._start, self._end)
+        return position - self._start if position >= 0 else -1
+
+    def consume(self, size):
+        """Drop the first size unread bytes."""
+        self._start = min(self._start + size, self._end)
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def clear(self):
+        self._start = self._end = 0
+
+
+class DobissProtocol(asyncio.BufferedProtocol):
+    """Collects the bytes sent by the controller so they can be awaited without blocking the event loop.
+       Received bytes are also passed to recorder(RECEIVED, data), if given (see DobissSystem.recordFrame).
+       onData() is called after bytes were buffered and onLost(protocol) when the connection is gone,
+       so bytes the controller sends on its own can be handled (see DobissSystem.consumePush).
+    """
+
+    def __init__(self, recorder=None, onData=None, onLost=None):
+        self.transport = None
+        self.buffer = RingBuffer()
+        self.recorder = recorder
+        self.onData = onData
+        self.onLost = onLost
+        self._dataReceived = asyncio.Event()
+        self._lost = False
+
+    @property
+    def closed(self):
+        """True if the connection is gone (or was never made)."""
+        return self._lost or self.transport is None or self.transport.is_closing()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint):
+        return self.buffer.writable(sizehint)
+
+    def buffer_updated(self, nbytes):
+        self.buffer.written(nbytes)
+        if self.recorder is not None:
+            size = len(self.buffer)
+            self.recorder(RECEIVED, self.buffer.peek(size - nbytes, size))
+        self._dataReceived.set()
+        if self.onData is not None:
+            self.onData()
+
+    def connection_lost(self, exc):
+        if exc:
+            _LOGGER.debug(f"Dobiss connection lost: {str(exc)}")
+        self._lost = True
+        # Wake up any reader so it does not wait for the full timeout
+        self._dataReceived.set()
+        if self.onLost is not None:
+            self.onLost(self)
+
+    def write(self, data):
+        """Queue data for sending. Raises ConnectionError if the connection is gone."""
+        if self.closed:
+            raise ConnectionError("Dobiss connection is closed")
+        self.transport.write(data)
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    async def waitFor(self, size, timeout):
+        """Wait until at least size bytes are buffered.
+           Raises asyncio.TimeoutError when the controller does not answer in time
+           and ConnectionError when the connection is lost while waiting.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self.buffer) < size:
+            if self._lost:
+                raise ConnectionError("Dobiss connection lost while waiting for data")
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            self._dataReceived.clear()
+            await asyncio.wait_for(self._dataReceived.wait(), remaining)
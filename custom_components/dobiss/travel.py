@@ -0,0 +1,57 @@
+"""
+Travel-time model estimating the position of a Dobiss cover, which has no position feedback.
+"""
+
+STOPPED, OPENING, CLOSING = 0, 1, -1
+
+CLOSED = 0
+OPEN = 100
+
+
+class TravelModel:
+    """The position of a cover (0 closed, 100 open), estimated from how long it has been moving.
+
+       openTime and closeTime are the seconds a full travel takes in each direction. The
+       position is None while unknown; it becomes known once the cover moved long enough
+       to reach an end, or when it is restored.
+    """
+
+    def __init__(self, openTime, closeTime, position=None):
+        self.openTime = openTime
+        self.closeTime = closeTime
+        self._position = position
+        self.direction = STOPPED
+        self._since = 0.0  # Monotonic time the current movement started
+
+    def position(self, now):
+        """The estimated position at monotonic time now, or None if unknown."""
+        if self.direction == STOPPED:
+            return self._position
+
+        elapsed = now - self._since
+        if self.direction == OPENING:
+            if self._position is None:
+                return OPEN if elapsed >= self.openTime else None
+            return min(OPEN, self._position + elapsed * OPEN / self.openTime)
+        if self._position is None:
+            return CLOSED if elapsed >= self.closeTime else None
+        return max(CLOSED, self._position - elapsed * OPEN / self.closeTime)
+
+    def follow(self, direction, now):
+        """The cover moves in direction (STOPPED, OPENING or CLOSING) since now, unless it already did."""
+        if direction == self.direction:
+            return
+        self._position = self.position(now)
+        self.direction = direction
+        self._since = now
+
+    def travelTime(self, target, now):
+        """The seconds of travel from the estimated position to target, negative when closing,
+           or None if the position is unknown.
+        """
+        position = self.position(now)
+        if position is None:
+            return None
+        if target >= position:
+            return (target - position) * self.openTime / OPEN
+        return (target - position) * self.closeTime / OPEN
@@ -0,0 +1,10 @@
+"""
+The tests import the standalone Dobiss modules (as custom_components/dobiss/test.py uses them)
+and the tools, such as the controller simulator, so Home Assistant is not needed.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "custom_components", "dobiss"), os.path.join(ROOT, "tools")]
@@ -0,0 +1,80 @@
+"""
+The frame codec: request frames and the decoders of the controller responses.
+"""
+
+import codec
+from codec import ModuleType, OutputType
+
+
+def test_request_frames():
+    assert codec.INSTALLATION_REQUEST == bytes.fromhex("af 0b 00 00 30 00 10 01 10 ff ff ff ff ff ff af")
+    assert codec.moduleRequest(5) == bytes.fromhex("af 10 ff 05 00 00 10 01 10 ff ff ff ff ff ff af")
+    assert codec.outputsRequest(ModuleType.Relais, 5, 12) == \
+        bytes.fromhex("af 10 08 05 01 00 20 0c 20 ff ff ff ff ff ff af")
+    assert codec.statusRequest(ModuleType.Dimmer, 5) == bytes.fromhex("af 01 10 05 00 00 00 01 00 ff ff ff ff ff ff af")
+    assert codec.actionHeader(5, 2) == bytes.fromhex("af 02 ff 05 00 00 08 02 08 ff ff ff ff ff ff af")
+    assert codec.actionRecord(5, 3, codec.Action.TurnOn, 40) == bytes.fromhex("05 03 01 ff ff 28 ff ff")
+
+
+def test_decode_installation():
+    data = bytearray(16)
+    data[0] = 0b00000101  # Modules 1 and 3
+    data[1] = 0b10000000  # Module 16
+    data[10] = 0b11111111  # Modules 81 and 82; bits 82-87 are no module addresses
+    data[11] = 0xFF  # Beyond the bitmap
+    assert codec.decodeInstallation(data) == [1, 3, 16, 81, 82]
+    assert codec.decodeInstallation(bytes(16)) == []
+
+
+def test_decode_module():
+    data = bytearray(16)
+    data[0] = 7
+    data[2] = 0x01
+    data[14] = ModuleType.Relais
+    assert codec.decodeModule(data) == (7, ModuleType.Relais, True, 12)
+
+    data[2] = 0x02
+    data[14] = ModuleType.V0_10
+    assert codec.decodeModule(data) == (7, ModuleType.V0_10, False, 4)
+
+
+def test_decode_outputs():
+    lines = [
+        b"Kitchen".ljust(30) + bytes([OutputType.Light, 0xFF]),
+        b"Screen up".ljust(30) + bytes([OutputType.Up, 2]),
+        b"Padding after the last output".ljust(32, b"\x00"),
+    ]
+    outputs = codec.decodeOutputs(4, b"".join(lines), 2)
+    assert outputs == [
+        (4, 0, "Kitchen", OutputType.Light, 0xFF),
+        (4, 1, "Screen up", OutputType.Up, 2),
+    ]
+    assert outputs[1].type is OutputType.Up
+
+
+def test_decode_status_frame():
+    frame = codec.statusRequest(ModuleType.Relais, 9)
+    assert codec.decodeStatusFrame(frame) == 9
+    # Other requests, and anything that is not the start of a frame
+    assert codec.decodeStatusFrame(codec.moduleRequest(9)) is None
+    assert codec.decodeStatusFrame(frame[1:] + b"\xAF") is None
+    assert codec.decodeStatusFrame(frame[:15] + b"\x00") is None
+
+
+def test_decode_status_does_not_copy():
+    data = bytearray(range(16))
+    values = codec.decodeStatus(memoryview(data), 4)
+    assert list(values) == [0, 1, 2, 3]
+    data[0] = 100
+    assert values[0] == 100
+
+
+def test_soft_dim_byte():
+    assert codec.softDimByte(None) == codec.DEFAULT_SOFT_DIM
+    assert codec.softDimByte(0.4) == 0
+    assert codec.softDimByte(2.6) == 3
+    assert codec.softDimByte(90) == codec.MAX_SOFT_DIM
+    assert codec.softDimByte(-1) == 0
+    assert codec.softDimSeconds(codec.DEFAULT_SOFT_DIM) == 0
+    assert codec.softDimSeconds(5) == 5
+    assert codec.actionRecord(5, 3, codec.Action.TurnOn, 40, softDim=codec.softDimByte(12))[6] == 12
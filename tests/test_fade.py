@@ -0,0 +1,83 @@
+"""
+Transitions: a soft dim in one action, or in steps when it is longer than a module can do.
+"""
+
+import asyncio
+
+import pytest
+
+import dobiss
+from dobiss import DobissSystem
+
+Action = DobissSystem.Action
+DIMMER = 2
+
+
+def run(test, monkeypatch):
+    """Run test(system, sent, sleeps) with the actions recorded instead of sent and the step waits skipped."""
+    sent = []
+    sleeps = []
+    sleep = asyncio.sleep
+
+    async def sendAction(moduleAddr, outputIndex, action, value=100, softDim=0xFF, **_):
+        sent.append((action, value, softDim))
+
+    async def fakeSleep(seconds):
+        sleeps.append(seconds)
+        await sleep(0)
+
+    async def main():
+        system = DobissSystem("127.0.0.1", 0)
+        system.sendAction = sendAction
+        system.values.update(DIMMER, bytes([10, 100, 0, 0]))
+        monkeypatch.setattr(dobiss.asyncio, "sleep", fakeSleep)
+        try:
+            await test(system, sent, sleeps)
+        finally:
+            system.close()
+
+    asyncio.run(main())
+
+
+async def settle(system):
+    while system._fades:
+        await asyncio.gather(*system._fades.values(), return_exceptions=True)
+
+
+def test_short_transition_is_one_soft_dim(monkeypatch):
+    async def test(system, sent, sleeps):
+        await system.dim(DIMMER, 0, Action.TurnOn, 80, 2.4)
+        await system.dim(DIMMER, 0, Action.TurnOn, 80)
+        assert sent == [(Action.TurnOn, 80, 2), (Action.TurnOn, 80, 0xFF)]
+        assert not system._fades
+
+    run(test, monkeypatch)
+
+
+@pytest.mark.parametrize("index, action, value, transition, expected", [
+    # From 10 to 100 in three steps of 50 s
+    (0, Action.TurnOn, 100, 150, [(Action.TurnOn, 40, 50), (Action.TurnOn, 70, 50), (Action.TurnOn, 100, 50)]),
+    # Turning off ends with the TurnOff action itself
+    (1, Action.TurnOff, 100, 120, [(Action.TurnOn, 50, 60), (Action.TurnOff, 100, 60)]),
+])
+def test_long_transition_is_sent_in_steps(monkeypatch, index, action, value, transition, expected):
+    async def test(system, sent, sleeps):
+        await system.dim(DIMMER, index, action, value, transition)
+        assert sent == expected[:1]
+        await settle(system)
+        assert sent == expected
+        assert sleeps == [transition / len(expected)] * (len(expected) - 1)
+
+    run(test, monkeypatch)
+
+
+def test_newer_action_cancels_the_remaining_steps(monkeypatch):
+    async def test(system, sent, sleeps):
+        await system.dim(DIMMER, 0, Action.TurnOn, 100, 150)
+        await system.toggle(DIMMER, 0)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert sent == [(Action.TurnOn, 40, 50), (Action.Toggle, 100, 0xFF)]
+        assert not system._fades
+
+    run(test, monkeypatch)
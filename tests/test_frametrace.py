@@ -0,0 +1,61 @@
+"""
+FrameCapture: what is recorded is read back by readCapture, as the replay tool does.
+"""
+
+import pytest
+
+import codec
+from codec import ModuleType
+from frametrace import CAPTURE_MAGIC, RECEIVED, SENT, FrameCapture, readCapture
+
+
+def test_capture_round_trip(tmp_path):
+    path = tmp_path / "dobiss.cap"
+    request = codec.statusRequest(ModuleType.Relais, 1)
+    received = bytearray(request + bytes(range(12)))
+
+    capture = FrameCapture(path)
+    capture.record(SENT, request)
+    # A view into the receive buffer, overwritten by the next receive
+    capture.record(RECEIVED, memoryview(received))
+    received[:] = bytes(len(received))
+    capture.close()
+
+    assert capture.closed
+    assert capture.records == 2
+    records = list(readCapture(path))
+    assert [(direction, data) for direction, _, data in records] == [
+        (SENT, request),
+        (RECEIVED, request + bytes(range(12))),
+    ]
+    assert records[0][1] <= records[1][1]
+
+
+def test_closed_capture_ignores_records(tmp_path):
+    path = tmp_path / "dobiss.cap"
+    capture = FrameCapture(path)
+    capture.record(SENT, b"\xAF")
+    capture.close()
+    capture.close()
+    capture.record(SENT, b"\xAF")
+
+    assert capture.records == 1
+    assert len(list(readCapture(path))) == 1
+
+
+def test_truncated_capture_keeps_complete_records(tmp_path):
+    path = tmp_path / "dobiss.cap"
+    capture = FrameCapture(path)
+    capture.record(SENT, b"first")
+    capture.record(RECEIVED, b"second")
+    capture.close()
+
+    path.write_bytes(path.read_bytes()[:-2])
+    assert [data for _, _, data in readCapture(path)] == [b"first"]
+
+
+def test_not_a_capture(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(CAPTURE_MAGIC[:-1] + b"?")
+    with pytest.raises(ValueError):
+        list(readCapture(path))
@@ -0,0 +1,76 @@
+"""
+AdaptiveSchedule: fast polls after activity, decay while quiet, and which modules are due.
+"""
+
+from polling import AdaptiveSchedule
+
+
+def test_modules_never_polled_are_due():
+    schedule = AdaptiveSchedule(1, 60)
+    assert schedule.due([1, 2], 0.0) == [1, 2]
+    assert schedule.nextPoll([1, 2], 0.0) == 1
+
+
+def test_quiet_module_decays_toward_max_interval():
+    schedule = AdaptiveSchedule(2, 10, activeWindow=0, decay=2)
+    now = 0.0
+    intervals = []
+    for _ in range(5):
+        schedule.polled(1, False, now)
+        intervals.append(schedule.intervals[1])
+        now += schedule.intervals[1]
+    assert intervals == [4, 8, 10, 10, 10]
+
+
+def test_activity_polls_fast_for_the_active_window():
+    schedule = AdaptiveSchedule(1, 60, activeWindow=30, decay=2)
+    schedule.polled(1, False, 0.0)
+    schedule.polled(1, False, 2.0)
+    assert schedule.intervals[1] == 4
+
+    schedule.activity(1, 10.0)
+    assert schedule.intervals[1] == 1
+    # Quiet polls within the window keep the interval at minInterval
+    schedule.polled(1, False, 20.0)
+    assert schedule.intervals[1] == 1
+    schedule.polled(1, False, 41.0)
+    assert schedule.intervals[1] == 2
+
+
+def test_changed_poll_counts_as_activity():
+    schedule = AdaptiveSchedule(1, 60, decay=2)
+    schedule.polled(1, False, 0.0)
+    schedule.polled(1, True, 100.0)
+    assert schedule.intervals[1] == 1
+
+
+def test_due_allows_slack_for_the_other_modules():
+    schedule = AdaptiveSchedule(2, 60, activeWindow=0, decay=2)
+    schedule.polled(1, False, 0.0)  # Next poll at 4
+    schedule.polled(2, False, 0.5)  # Next poll at 4.5
+    assert schedule.due([1, 2], 2.5) == []
+    assert schedule.due([1, 2], 4.0) == [1, 2]
+
+
+def test_next_poll_is_the_earliest_module():
+    schedule = AdaptiveSchedule(1, 60, activeWindow=0, decay=2)
+    schedule.polled(1, False, 0.0)  # Next poll at 2
+    schedule.polled(2, False, 0.0)
+    schedule.polled(2, False, 2.0)  # Next poll at 6
+    assert schedule.nextPoll([1, 2], 0.5) == 1.5
+    assert schedule.nextPoll([2], 0.5) == 5.5
+    # Never sooner than minInterval, never later than maxInterval
+    assert schedule.nextPoll([1, 2], 1.9) == 1
+    assert schedule.nextPoll([], 0.0) == 60
+
+
+def test_removed_module_does_not_keep_polls_coming():
+    schedule = AdaptiveSchedule(1, 60, activeWindow=0, decay=2)
+    schedule.polled(1, False, 0.0)
+    schedule.polled(2, False, -10.0)
+    # Modules 2 and 3 were removed from the installation; a command sent to 3 earlier still counts as activity
+    schedule.activity(3, 0.0)
+    modules = [1]
+    assert schedule.due(modules, 1.0) == []
+    assert schedule.nextPoll(modules, 1.0) == 1.0
+    assert schedule.nextPoll(modules, 0.0) == 2.0
@@ -0,0 +1,70 @@
+"""
+OutputRegistry: the indexes kept as outputs are added, replaced and removed, and the changes between imports.
+"""
+
+from codec import OutputType
+from registry import Output, OutputRegistry
+
+
+def outputs():
+    return [
+        Output(1, 0, "Kitchen", OutputType.Light, 0xFF),
+        Output(1, 1, "Screen up", OutputType.Up, 0),
+        Output(1, 2, "Screen down", OutputType.Down, 0),
+        Output(2, 0, "Garden", OutputType.Light, 0xFF),
+        Output(2, 1, "Awning up", OutputType.Up, 0),
+    ]
+
+
+def test_indexes():
+    registry = OutputRegistry(outputs())
+    assert len(registry) == 5
+    assert registry.get(1, 2).name == "Screen down"
+    assert registry.get(3, 0) is None
+    assert [output.name for output in registry.ofType(OutputType.Light)] == ["Kitchen", "Garden"]
+    assert list(registry.ofType(OutputType.Fan)) == []
+    # Groups with the same number on different modules stay apart
+    assert [output.index for output in registry.inGroup(1, 0)] == [1, 2]
+    assert [output.key for output in registry.inGroup(2, 0)] == [(2, 1)]
+    assert list(registry.inGroup(3, 0)) == []
+    assert registry[0].name == "Kitchen"
+
+
+def test_add_replaces_an_output():
+    registry = OutputRegistry(outputs())
+    registry.add(Output(1, 1, "Screen", OutputType.Light, 0xFF))
+
+    assert len(registry) == 5
+    assert registry.get(1, 1).name == "Screen"
+    assert [output.key for output in registry.ofType(OutputType.Up)] == [(2, 1)]
+    assert [output.key for output in registry.ofType(OutputType.Light)] == [(1, 0), (2, 0), (1, 1)]
+    assert [output.key for output in registry.inGroup(1, 0)] == [(1, 2)]
+    # A replaced output moves to the end of the import order
+    assert registry[-1].key == (1, 1)
+
+
+def test_remove():
+    registry = OutputRegistry(outputs())
+    assert registry.remove(1, 1).name == "Screen up"
+    assert registry.remove(1, 1) is None
+
+    registry.removeModule(1)
+    assert [output.key for output in registry] == [(2, 0), (2, 1)]
+    assert list(registry.inGroup(1, 0)) == []
+    assert [output.key for output in registry.ofType(OutputType.Light)] == [(2, 0)]
+
+
+def test_changes():
+    previous = OutputRegistry(outputs())
+    current = OutputRegistry(outputs())
+    assert current.changes(previous) == ([], [], [])
+
+    current.remove(2, 0)
+    current.add(Output(1, 0, "Dining", OutputType.Light, 0xFF))  # Renamed
+    current.add(Output(1, 1, "Screen up", OutputType.Fan, 0))  # Changed type
+    current.add(Output(3, 0, "Attic", OutputType.Light, 0xFF))
+    added, removed, changed = current.changes(previous)
+
+    assert [output.key for output in added] == [(1, 1), (3, 0)]
+    assert [output.key for output in removed] == [(1, 1), (2, 0)]
+    assert [output.name for output in changed] == ["Dining"]
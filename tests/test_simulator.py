@@ -0,0 +1,394 @@
+"""
+DobissSystem against the controller simulator: resync, pipelining, scheduling, write-through,
+push and installation sync, with the failures the simulator can inject.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import dobiss
+from dobiss import DobissSystem, Priority
+from simulator import DIMMER, DobissSimulator, SimulatedModule
+
+RELAY, DIMMER_ADDR = 1, 2  # Module addresses in the default simulated installation
+
+
+@pytest.fixture(autouse=True)
+def shortTimeouts(monkeypatch):
+    # Lost bytes show up as receive timeouts; keep them short
+    monkeypatch.setattr(dobiss, "TIMEOUT", 0.2)
+
+
+def run(test, relays=1, dimmers=1, **options):
+    """Run test(system, simulator) against a fresh simulator, then shut both down."""
+    async def main():
+        simulator = await DobissSimulator(relays, dimmers, **options).start()
+        system = DobissSystem("127.0.0.1", simulator.port)
+        try:
+            await test(system, simulator)
+        finally:
+            system.close()
+            await simulator.stop()
+
+    asyncio.run(main())
+
+
+def setValues(simulator):
+    """Give every simulated output a different value."""
+    for module in simulator.modules.values():
+        for index in range(module.outputCount):
+            module.values[index] = (module.address * 7 + index * 13) % 101
+
+
+def assertValues(system, simulator):
+    for module in simulator.modules.values():
+        for index in range(module.outputCount):
+            assert system.values.value(module.address, index) == module.values[index], (module.address, index)
+
+
+def test_import_and_poll():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        assert set(system.modules) == set(simulator.modules)
+        assert len(system.outputs) == sum(module.outputCount for module in simulator.modules.values())
+
+        setValues(simulator)
+        await system.requestAllStatus()
+        assertValues(system, simulator)
+
+    run(test, relays=3, dimmers=2)
+
+
+def test_lost_bytes_never_yield_wrong_values():
+    async def test(system, simulator):
+        setValues(simulator)
+        assert await system.importFullInstallation()
+
+        simulator.dropRate = 0.2
+        for _ in range(15):
+            await system.requestAllStatus()
+            # A response that lost a byte is dropped, so what we have is right or not updated
+            assertValues(system, simulator)
+        assert simulator.droppedBytes > 0
+        assert system.misalignedFrames > 0
+
+        simulator.dropRate = 0
+        await system.requestAllStatus()
+        assertValues(system, simulator)
+
+    run(test, relays=6, dimmers=2, seed=1)
+
+
+def test_pipelining_falls_back_to_sequential():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        assert system.pipelined
+
+        simulator.dropRate = 0.5
+        for _ in range(30):
+            await system.requestAllStatus()
+            if not system.pipelined:
+                break
+        assert not system.pipelined
+
+        simulator.dropRate = 0
+        setValues(simulator)
+        await system.requestAllStatus()
+        assertValues(system, simulator)
+
+    run(test, relays=6, dimmers=2, seed=2)
+
+
+def test_pipelining_is_tried_again_after_a_while():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+
+        simulator.dropRate = 0.5
+        while system.pipelined:
+            await system.requestAllStatus()
+
+        simulator.dropRate = 0
+        await system.requestAllStatus()
+        assert not system.pipelined
+
+        # PIPELINE_RETRY_INTERVAL later
+        system._pipelineRetryAt = time.monotonic()
+        await system.requestAllStatus()
+        assert system.pipelined
+        assert system._pipelineFailures == 0
+
+    run(test, relays=6, dimmers=2, seed=2)
+
+
+def test_lost_connection_does_not_count_against_pipelining():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        connections = simulator.connections
+
+        # The connection drops while a pipelined poll waits for its responses
+        simulator.latency = 0.1
+        poll = asyncio.create_task(system.requestAllStatus())
+        await asyncio.sleep(0.05)
+        for writer in list(simulator._clients.values()):
+            writer.close()
+        await poll
+        assert system._pipelineFailures == 0
+        assert simulator.connections == connections  # Reconnecting is left to the next job
+
+        simulator.latency = 0
+        setValues(simulator)
+        await system.requestAllStatus()
+        assert system.pipelined
+        assertValues(system, simulator)
+
+    run(test, relays=6, dimmers=2)
+
+
+def test_commands_run_ahead_of_queued_jobs():
+    async def test(system, simulator):
+        order = []
+
+        async def job(name, duration):
+            order.append(name)
+            await asyncio.sleep(duration)
+
+        first = asyncio.create_task(system.submit(Priority.Import, job, "import 1", 0.05))
+        while not order:
+            await asyncio.sleep(0.001)
+        await asyncio.gather(
+            first,
+            system.submit(Priority.Import, job, "import 2", 0),
+            system.submit(Priority.Poll, job, "poll", 0),
+            system.submit(Priority.Command, job, "command", 0),
+        )
+        assert order == ["import 1", "command", "poll", "import 2"]
+
+    run(test)
+
+
+def test_commands_go_between_poll_jobs():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        system.pipelined = False  # One module per poll job
+        simulator.latency = 0.02
+
+        poll = asyncio.create_task(system.requestAllStatus())
+        await asyncio.sleep(0.03)
+        await system.setOn(RELAY, 0)
+        assert not poll.done()
+        await poll
+        assert simulator.modules[RELAY].values[0] == 100
+
+    run(test, relays=8, dimmers=4)
+
+
+def test_write_through_is_confirmed_by_a_poll():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+
+        await system.setOn(DIMMER_ADDR, 0, 40)
+        assert system.values.value(DIMMER_ADDR, 0) == 40
+        await system.requestAllStatus()
+        assert system.values.value(DIMMER_ADDR, 0) == 40
+        assert not system.unconfirmed
+
+    run(test)
+
+
+def test_write_through_rolls_back_when_not_confirmed(monkeypatch):
+    monkeypatch.setattr(dobiss, "CONFIRM_GRACE", 0.3)
+
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+
+        await system.setOn(DIMMER_ADDR, 0, 40)
+        # The controller did not carry out the action
+        simulator.modules[DIMMER_ADDR].values[0] = 0
+
+        # Within the grace period, a poll may still report the value on its way
+        await system.requestAllStatus()
+        assert system.values.value(DIMMER_ADDR, 0) == 40
+
+        await asyncio.sleep(0.3)
+        await system.requestAllStatus()
+        assert system.values.value(DIMMER_ADDR, 0) == 0
+        assert not system.unconfirmed
+
+    run(test)
+
+
+def test_push_is_applied():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        pushes = []
+        system.onPush = pushes.append
+        system.setListening(True)
+
+        simulator.setOutput(RELAY, 3, 100)
+        await asyncio.sleep(0.1)
+        assert pushes == [[RELAY]]
+        assert system.values.value(RELAY, 3) == 100
+        assert system.pushFrames == 1
+        assert system.pushHealthy(10)
+
+    run(test, push=True)
+
+
+def test_late_response_is_not_a_push():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        pushes = []
+        system.onPush = pushes.append
+        system.setListening(True)
+
+        # The response arrives after the request timed out, between jobs
+        simulator.latency = 0.3
+        module = system.modules[RELAY]
+        await system.submit(Priority.Poll, system.requestStatus, RELAY, module['type'], module['outputCount'])
+        simulator.latency = 0
+        await asyncio.sleep(0.4)
+
+        assert pushes == []
+        assert system.pushFrames == 0
+        assert not system.pushHealthy(10)
+
+    run(test, push=True)
+
+
+def test_push_ahead_of_pipelined_poll():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        pushes = []
+        system.onPush = pushes.append
+        system.setListening(True)
+
+        simulator.latency = 0.01
+        simulator.setOutput(RELAY, 0, 100)
+        await system.requestAllStatus()
+        await asyncio.sleep(0.05)
+
+        # Our own responses are not taken for pushes, so the pipelined poll succeeds
+        assert pushes == [[RELAY]]
+        assert system.pushFrames == 1
+        assert system._pipelineFailures == 0
+        assert system.values.value(RELAY, 0) == 100
+
+    run(test, relays=4, dimmers=0, push=True)
+
+
+def test_sync_installation_only_imports_changed_modules():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+
+        removed = 2
+        del simulator.modules[removed]
+        simulator.modules[5] = SimulatedModule(5, DIMMER)
+        setValues(simulator)
+
+        requested = []
+        outputsImport = system.outputsImport
+
+        def spy(moduleAddr, *args):
+            requested.append(moduleAddr)
+            return outputsImport(moduleAddr, *args)
+
+        system.outputsImport = spy
+
+        # Entities and polls running during the sync see the old or the new modules, never a part
+        seen = set()
+        syncing = True
+
+        async def watch():
+            while syncing:
+                seen.add(frozenset(system.modules))
+                await asyncio.sleep(0)
+
+        watcher = asyncio.create_task(watch())
+        changes = await system.syncInstallation()
+        syncing = False
+        await watcher
+
+        assert changes.complete
+        assert requested == [5]
+        assert seen <= {frozenset([1, 2, 3, 4]), frozenset([1, 3, 4, 5])}
+        assert set(system.modules) == {1, 3, 4, 5}
+        assert {output.moduleAddress for output in changes.added} == {5}
+        assert {output.moduleAddress for output in changes.removed} == {removed}
+        assert not changes.changed
+        assert system.values.value(removed, 0) is None
+        # Only the new module is polled; the others kept their values
+        module = simulator.modules[5]
+        assert [system.values.value(5, index) for index in range(module.outputCount)] == list(module.values)
+
+    run(test, relays=3, dimmers=1)
+
+
+def test_abandoned_job_is_cancelled():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        cancelled = asyncio.Event()
+
+        async def hang():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(system.submit(Priority.Poll, hang), 0.1)
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+        # The next command does not wait for the abandoned job
+        start = time.monotonic()
+        await system.setOn(RELAY, 0)
+        assert time.monotonic() - start < 1
+        assert simulator.modules[RELAY].values[0] == 100
+
+    run(test)
+
+
+def test_unreachable_controller_does_not_hold_up_commands():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        system.disconnect()
+        await simulator.stop()
+
+        # One connect attempt, not one per poll job and not the whole backoff
+        start = time.monotonic()
+        await system.requestAllStatus()
+        await system.setOn(RELAY, 0)
+        assert time.monotonic() - start < 1
+        assert system.connectRetries == 2
+
+        await simulator.start(port=simulator.port)
+        await system.setOn(RELAY, 0)
+        assert simulator.modules[RELAY].values[0] == 100
+
+    run(test, relays=20, dimmers=0)
+
+
+def test_connect_retries_while_refused():
+    async def test(system, simulator):
+        # The simulator does not listen for refuseTime seconds after it starts
+        await system.connect()
+        assert system.connected
+        assert system.connectRetries >= 1
+        assert simulator.refused >= 1
+        assert simulator.connections == 1
+
+    run(test, refuseRate=1.0, refuseTime=0.3)
+
+
+def test_concurrent_jobs_share_one_connection():
+    async def test(system, simulator):
+        assert await system.importFullInstallation()
+        system.disconnect()
+        connections = simulator.connections
+
+        await asyncio.gather(system.requestAllStatus(), system.setOn(RELAY, 0), system.requestAllStatus())
+        assert simulator.connections == connections + 1
+
+    run(test, relays=4, dimmers=2)
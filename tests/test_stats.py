@@ -0,0 +1,50 @@
+"""
+Histogram percentiles and summaries.
+"""
+
+import pytest
+
+from stats import Histogram, Timings
+
+
+def test_percentile_is_the_upper_bound_of_its_bucket():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.record(0.0005)  # Up to 1 ms
+    for _ in range(9):
+        histogram.record(0.003)  # Up to 4 ms
+    histogram.record(20.0)  # Slower than the last bucket
+
+    assert histogram.percentile(0.50) == 0.001
+    assert histogram.percentile(0.90) == 0.001
+    assert histogram.percentile(0.95) == 0.004
+    assert histogram.percentile(0.99) == 0.004
+    assert histogram.percentile(1.0) == 20.0
+    assert histogram.max == 20.0
+    assert histogram.mean == pytest.approx((90 * 0.0005 + 9 * 0.003 + 20.0) / 100)
+
+
+def test_percentile_never_exceeds_the_maximum():
+    histogram = Histogram()
+    histogram.record(0.0015)
+    assert histogram.percentile(0.5) == 0.0015
+    assert histogram.percentile(0.99) == 0.0015
+
+
+def test_empty_histogram():
+    histogram = Histogram()
+    assert histogram.percentile(0.5) == 0.0
+    assert histogram.asdict() == {'count': 0, 'last': None, 'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+
+def test_timings_in_milliseconds():
+    timings = Timings()
+    assert "poll" not in timings
+    timings.record("poll", 0.002)
+    timings.record("poll", 0.004)
+    summary = timings.asdict()["poll"]
+    assert summary['count'] == 2
+    assert summary['last'] == 4.0
+    assert summary['mean'] == pytest.approx(3.0)
+    assert summary['p50'] == 2.0
+    assert summary['max'] == 4.0
@@ -0,0 +1,56 @@
+"""
+StatusStore snapshots and the changes between them.
+"""
+
+from status import StatusSnapshot, StatusStore, offset
+
+
+def test_snapshot_is_only_copied_after_a_change():
+    store = StatusStore()
+    store.update(1, bytes([0, 100]))
+    snapshot = store.snapshot()
+    assert store.snapshot() is snapshot
+
+    store.set(1, 0, 40)
+    assert store.snapshot() is not snapshot
+    assert snapshot.value(1, 0) == 0
+    assert store.snapshot().value(1, 0) == 40
+
+
+def test_never_polled_outputs_have_no_value():
+    store = StatusStore()
+    store.update(2, bytes([5, 6]))
+    snapshot = store.snapshot()
+    assert snapshot.value(2, 1) == 6
+    assert snapshot[offset(2, 1)] == 6
+    assert snapshot.value(2, 2) is None
+    assert snapshot[offset(1, 0)] is None
+    assert snapshot.modules() == [2]
+
+
+def test_changes_from_nothing():
+    store = StatusStore()
+    store.update(1, bytes([0, 100]))
+    assert store.snapshot().changes(None) == {(1, 0): (None, 0), (1, 1): (None, 100)}
+    assert store.snapshot().changes(StatusSnapshot()) == {(1, 0): (None, 0), (1, 1): (None, 100)}
+
+
+def test_changes_between_snapshots():
+    store = StatusStore()
+    store.update(1, bytes([0, 100, 0]))
+    store.update(3, bytes([10, 20]))
+    previous = store.snapshot()
+    assert store.snapshot().changes(previous) == {}
+
+    store.set(3, 1, 25)
+    store.update(1, bytes([0, 100, 0]))  # Polled again without a change
+    store.update(4, bytes([50]))
+    assert store.snapshot().changes(previous) == {(3, 1): (20, 25), (4, 0): (None, 50)}
+
+
+def test_more_outputs_polled():
+    store = StatusStore()
+    store.update(1, bytes([7]))
+    previous = store.snapshot()
+    store.update(1, bytes([7, 8]))
+    assert store.snapshot().changes(previous) == {(1, 1): (None, 8)}
@@ -0,0 +1,53 @@
+"""
+TravelModel: the position of a cover estimated from how long it moves.
+"""
+
+import pytest
+
+from travel import CLOSED, CLOSING, OPEN, OPENING, STOPPED, TravelModel
+
+
+def test_position_follows_the_movement():
+    model = TravelModel(20, 10, position=CLOSED)
+    model.follow(OPENING, 100.0)
+    assert model.position(105.0) == 25
+    assert model.position(130.0) == OPEN  # Never past the end
+
+    model.follow(STOPPED, 110.0)
+    assert model.position(200.0) == 50
+    model.follow(CLOSING, 200.0)
+    assert model.position(202.0) == 30
+    assert model.position(300.0) == CLOSED
+
+
+def test_following_the_same_direction_keeps_the_start():
+    model = TravelModel(10, 10, position=CLOSED)
+    model.follow(OPENING, 0.0)
+    model.follow(OPENING, 5.0)
+    assert model.position(5.0) == 50
+
+
+def test_unknown_position_is_known_at_an_end():
+    model = TravelModel(10, 20)
+    assert model.position(0.0) is None
+    model.follow(CLOSING, 0.0)
+    assert model.position(19.0) is None
+    assert model.position(20.0) == CLOSED
+    model.follow(STOPPED, 25.0)
+    assert model.position(30.0) == CLOSED
+
+    model = TravelModel(10, 20)
+    model.follow(OPENING, 0.0)
+    model.follow(STOPPED, 5.0)  # Stopped halfway: still unknown
+    assert model.position(6.0) is None
+
+
+def test_travel_time():
+    model = TravelModel(20, 10, position=50)
+    assert model.travelTime(OPEN, 0.0) == 10
+    assert model.travelTime(CLOSED, 0.0) == -5
+    assert model.travelTime(50, 0.0) == 0
+
+    model.follow(OPENING, 0.0)
+    assert model.travelTime(75, 2.0) == pytest.approx(3)
+    assert TravelModel(20, 10).travelTime(OPEN, 0.0) is None
@@ -0,0 +1,73 @@
+"""
+Microbenchmark of the Dobiss frame codec against the hex-string frames and per-byte
+parsing loops it replaced.
+
+Usage: python tools/bench_codec.py [number]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "dobiss"))
+
+import codec  # noqa: E402
+
+
+def legacyStatusRequest(moduleAddr, moduleType):
+    return bytearray.fromhex(
+        "AF 01 " + f"{moduleType:02x}" + f"{moduleAddr:02x}" + " 00 00 00 01 00 FF FF FF FF FF FF AF")
+
+
+def legacyActionRecord(moduleAddr, outputIndex, action, value=100, delayOn=0xFF, delayOff=0xFF, softDim=0xFF,
+                       red=0xFF):
+    return bytes((moduleAddr, outputIndex, action.value, delayOn, delayOff, int(value), softDim, red))
+
+
+def legacyInstallation(data):
+    result = []
+    for i in range(0, 82):
+        if (data[int(i / 8)] >> int(i % 8)) & 1:
+            result.append(i + 1)
+    return result
+
+
+def legacyOutputs(moduleAddr, data, outputCount):
+    result = []
+    for outputIndex in range(0, outputCount):
+        line = data[outputIndex * 32: (outputIndex + 1) * 32]
+        result.append({
+            'moduleAddress': moduleAddr,
+            'index': outputIndex,
+            'name': line[0:30].strip().decode(),
+            'type': codec.OutputType(line[30]),
+            'groupIndex': line[31],
+        })
+    return result
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    bitmap = bytes([0xFF] * 10 + [0x03] + [0x00] * 5)  # All 82 modules present
+    outputs = b"".join(f"Output {i}".encode().ljust(30) + bytes((i % 5, i)) for i in range(12))
+    status = bytes(range(16))
+
+    cases = [
+        ("status request", lambda: legacyStatusRequest(42, 0x08), lambda: codec.statusRequest(0x08, 42)),
+        ("action record", lambda: legacyActionRecord(42, 3, codec.Action.TurnOn),
+         lambda: codec.actionRecord(42, 3, codec.Action.TurnOn)),
+        ("installation bitmap", lambda: legacyInstallation(bitmap), lambda: codec.decodeInstallation(bitmap)),
+        ("output name table", lambda: legacyOutputs(42, outputs, 12), lambda: codec.decodeOutputs(42, outputs, 12)),
+        ("status record", lambda: [status[i] for i in range(12)], lambda: codec.decodeStatus(status, 12)),
+    ]
+
+    print(f"{'case':<22}{'legacy us':>12}{'codec us':>12}{'speedup':>10}")
+    for name, legacy, current in cases:
+        legacyTime = min(timeit.repeat(legacy, number=number, repeat=3)) / number * 1e6
+        codecTime = min(timeit.repeat(current, number=number, repeat=3)) / number * 1e6
+        print(f"{name:<22}{legacyTime:>12.3f}{codecTime:>12.3f}{legacyTime / codecTime:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Protocol-level benchmark of DobissSystem against the local controller simulator.
+
+Sweeps the number of modules, the module mix and the injected round-trip time and
+measures full import, full poll, single command and command burst latency.
+
+Usage: python tools/benchmark.py --modules 1 10 41 82 --rtt 0 2 10 --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "dobiss"))
+
+import dobiss  # noqa: E402
+from simulator import DobissSimulator  # noqa: E402
+
+MANIFEST = os.path.join(os.path.dirname(__file__), "..", "custom_components", "dobiss", "manifest.json")
+
+# Share of relay, dimmer and 0-10V modules
+MIXES = {
+    "relay": (1, 0, 0),
+    "dimmer": (0, 1, 0),
+    "mixed": (2, 1, 1),
+}
+
+BURST_SIZE = 24  # Outputs switched at once by the command burst scenario
+
+
+def splitModules(count, mix):
+    """Split count modules over the module types according to the mix ratios."""
+    total = sum(mix)
+    counts = [count * share // total for share in mix]
+    # Hand out the remainder to the types in the mix, in order
+    present = [i for i, share in enumerate(mix) if share]
+    for i in range(count - sum(counts)):
+        counts[present[i % len(present)]] += 1
+    return counts
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of sorted samples."""
+    index = max(0, min(len(samples) - 1, int(round(fraction * len(samples) + 0.5)) - 1))
+    return samples[index]
+
+
+def summarize(samples, elapsed, operations):
+    samples = sorted(samples)
+    return {
+        "samples": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "throughput": operations / elapsed if elapsed else 0.0,
+    }
+
+
+async def measure(repeat, operation, operations=1):
+    """Run operation repeat times and summarize the latency of each run."""
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t = time.perf_counter()
+        await operation()
+        samples.append(time.perf_counter() - t)
+    return summarize(samples, time.perf_counter() - start, repeat * operations)
+
+
+async def runCase(moduleCount, mixName, rtt, repeat, importRepeat):
+    relays, dimmers, v0_10 = splitModules(moduleCount, MIXES[mixName])
+    simulator = await DobissSimulator(relays, dimmers, v0_10, latency=rtt / 1000, seed=0).start()
+    system = dobiss.DobissSystem("127.0.0.1", simulator.port)
+
+    results = {}
+    try:
+        results["import"] = await measure(importRepeat, system.importFullInstallation)
+
+        results["poll"] = await measure(repeat, system.requestAllStatus)
+
+        first = system.outputs[0]
+        results["command"] = await measure(repeat, lambda: system.toggle(first.moduleAddress, first.index))
+
+        burst = system.outputs[:BURST_SIZE]
+
+        async def commandBurst():
+            await asyncio.gather(*[system.toggle(output.moduleAddress, output.index) for output in burst])
+
+        results["burst"] = await measure(repeat, commandBurst, len(burst))
+    finally:
+        system.close()
+        await simulator.stop()
+
+    return [
+        {"modules": moduleCount, "mix": mixName, "rtt_ms": rtt, "scenario": scenario, **summary}
+        for scenario, summary in results.items()
+    ]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark DobissSystem against the controller simulator")
+    parser.add_argument("--modules", type=int, nargs="+", default=[1, 10, 41, 82])
+    parser.add_argument("--mix", nargs="+", choices=sorted(MIXES), default=["mixed"])
+    parser.add_argument("--rtt", type=float, nargs="+", default=[0, 2, 10], help="Injected round-trip time (ms)")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per poll/command scenario")
+    parser.add_argument("--import-repeat", type=int, default=3, help="Runs of the full import")
+    parser.add_argument("--json", help="Write the results to this file ('-' for stdout)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+
+    results = []
+    for mixName in args.mix:
+        for moduleCount in args.modules:
+            for rtt in args.rtt:
+                results.extend(await runCase(moduleCount, mixName, rtt, args.repeat, args.import_repeat))
+
+    if args.json == "-":
+        output = sys.stdout
+    else:
+        output = sys.stderr if args.json else sys.stdout
+        print(f"{'mix':<8}{'modules':>8}{'rtt ms':>8}  {'scenario':<9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'ops/s':>10}", file=output)
+        for r in results:
+            print(f"{r['mix']:<8}{r['modules']:>8}{r['rtt_ms']:>8g}  {r['scenario']:<9}{r['p50_ms']:>10.2f}"
+                  f"{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['throughput']:>10.1f}", file=output)
+
+    if args.json:
+        with open(MANIFEST) as manifest:
+            version = json.load(manifest)["version"]
+        report = {
+            "version": version,
+            "python": platform.python_version(),
+            "results": results,
+        }
+        if args.json == "-":
+            json.dump(report, sys.stdout, indent=2)
+        else:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
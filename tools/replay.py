@@ -0,0 +1,247 @@
+"""
+Replay a Dobiss traffic capture (see the startCapture service) without the hardware.
+
+A replay server answers every request with the bytes the controller sent after it in the
+capture, immediately or at the recorded pace. DobissSystem then sends the captured requests
+again, so the parser, the resync logic and the scheduler run against real field traffic.
+
+Usage: python tools/replay.py dobiss-20240101-120000.cap [--paced] [--repeat 10] [--profile]
+"""
+
+import argparse
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "dobiss"))
+
+import dobiss  # noqa: E402
+from frametrace import readCapture, SENT  # noqa: E402
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def exchanges(records):
+    """Group the capture into (sent, [(delay, received), ...]) exchanges.
+       delay is the time between the request and each part of the response; data the
+       controller sent before any request has an empty request.
+    """
+    result = []
+    sent, sentAt, responses = b"", None, []
+    for direction, timestamp, data in records:
+        if direction == SENT:
+            if sent or responses:
+                result.append((sent, responses))
+            sent, sentAt, responses = data, timestamp, []
+        else:
+            responses.append((timestamp - sentAt if sentAt is not None else 0.0, data))
+    if sent or responses:
+        result.append((sent, responses))
+    return result
+
+
+class ReplayServer:
+    """Plays the controller side of a capture, one exchange per request received."""
+
+    def __init__(self, exchanges, paced=False):
+        self.exchanges = exchanges
+        self.paced = paced
+        self.position = 0
+        self.mismatches = 0
+
+        self.server = None
+        self._handlers = set()
+        self.port = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            # Let the handlers see the client go away instead of cancelling them on exit
+            if self._handlers:
+                await asyncio.wait(self._handlers, timeout=1)
+            await self.server.wait_closed()
+            self.server = None
+
+    def rewind(self):
+        self.position = 0
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        loop = asyncio.get_running_loop()
+        lastSendAt = 0.0
+        buffer = bytearray()
+
+        def respond():
+            nonlocal lastSendAt
+            while self.position < len(self.exchanges):
+                sent, responses = self.exchanges[self.position]
+                if len(buffer) < len(sent):
+                    return
+                if buffer[:len(sent)] != sent:
+                    self.mismatches += 1
+                    _LOGGER.debug(f"Request {self.position} differs from the capture: {bytes(buffer[:len(sent)]).hex(' ')}")
+                del buffer[:len(sent)]
+                self.position += 1
+
+                now = loop.time()
+                for delay, data in responses:
+                    # Keep the responses in order; timers due at the same time may run in any order
+                    sendAt = max(now + delay if self.paced else now, lastSendAt + 1e-6)
+                    lastSendAt = sendAt
+                    loop.call_at(sendAt, lambda data=data: writer.is_closing() or writer.write(data))
+
+        try:
+            respond()
+            while self.position < len(self.exchanges):
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buffer += data
+                respond()
+            # Keep the connection open until the client is done
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(task)
+
+
+def requests(exchanges):
+    """The DobissSystem calls that send the requests of the capture again, as (method name, args)."""
+    calls = []
+    pendingHeader = None
+    for sent, _ in exchanges:
+        if not sent:
+            continue
+        if pendingHeader is not None:
+            # The action records following an action header
+            records = [tuple(sent[i:i + 8]) for i in range(0, len(sent), 8)]
+            calls.append(("sendActions", [[(m, o, a, v, on, off, dim, red) for m, o, a, on, off, v, dim, red in records]]))
+            pendingHeader = None
+            continue
+
+        command, moduleType, moduleAddr = sent[1], sent[2], sent[3]
+        if command == 0x0B:
+            calls.append(("importInstallation", []))
+        elif command == 0x10:
+            # Module records and output tables, possibly pipelined
+            frames = [sent[i:i + 16] for i in range(0, len(sent), 16)]
+            calls.append(("importChunk", [[(frame[4], frame[3], frame[2], frame[7]) for frame in frames]]))
+        elif command == 0x01 and len(sent) > 16:
+            modules = [(frame[3], frame[2]) for frame in (sent[i:i + 16] for i in range(0, len(sent), 16))]
+            calls.append(("requestStatusPipelined", [modules]))
+        elif command == 0x01:
+            calls.append(("requestStatus", [moduleAddr, moduleType]))
+        elif command == 0x02:
+            pendingHeader = sent
+        else:
+            _LOGGER.warning(f"Skipping unknown request {sent.hex(' ')}")
+    return calls
+
+
+def outputCount(system, moduleAddr, moduleType):
+    module = system.modules.get(moduleAddr)
+    if module is not None:
+        return module['outputCount']
+    return 12 if moduleType == dobiss.DobissSystem.ModuleType.Relais else 4
+
+
+async def replay(system, calls):
+    async with system.lease():
+        # The captured requests are sent directly, not as scheduler jobs, so connect here
+        await system.ensureConnected()
+        for method, args in calls:
+            if method == "requestStatus":
+                moduleAddr, moduleType = args
+                await system.requestStatus(moduleAddr, moduleType, outputCount(system, moduleAddr, moduleType))
+            elif method == "requestStatusPipelined":
+                modules = [
+                    {'address': moduleAddr, 'type': moduleType,
+                     'outputCount': outputCount(system, moduleAddr, moduleType)}
+                    for moduleAddr, moduleType in args[0]
+                ]
+                await system.requestStatusPipelined(modules)
+            elif method == "importChunk":
+                await system.importChunk([
+                    system.moduleImport(moduleAddr) if subCommand == 0x00 else
+                    system.outputsImport(moduleAddr, moduleType, outputCount)
+                    for subCommand, moduleAddr, moduleType, outputCount in args[0]
+                ])
+            else:
+                await getattr(system, method)(*args)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a Dobiss traffic capture")
+    parser.add_argument("capture")
+    parser.add_argument("--paced", action="store_true", help="Answer at the recorded pace instead of at full speed")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the capture this many times")
+    parser.add_argument("--profile", action="store_true", help="Profile the replay and print the hottest functions")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+
+    captured = exchanges(readCapture(args.capture))
+    calls = requests(captured)
+    server = await ReplayServer(captured, args.paced).start()
+    system = dobiss.DobissSystem("127.0.0.1", server.port)
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    try:
+        for _ in range(args.repeat):
+            server.rewind()
+            if profiler:
+                profiler.enable()
+            await replay(system, calls)
+            if profiler:
+                profiler.disable()
+            # Each repetition replays the capture on a fresh connection
+            system.disconnect()
+    finally:
+        elapsed = time.perf_counter() - start
+        system.close()
+        await server.stop()
+
+    report = {
+        'exchanges': len(captured),
+        'requests': len(calls),
+        'repeat': args.repeat,
+        'elapsed': elapsed,
+        'mismatches': server.mismatches,
+        'frames': system.frameStats,
+        'counters': system.counters,
+        'timings': system.timings.asdict(),
+        'values': system.values.asdict(),
+    }
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, default=list)
+    else:
+        print(f"Replayed {len(calls)} requests x{args.repeat} in {elapsed * 1000:.1f} ms, "
+              f"{server.mismatches} differed from the capture")
+        print(f"Frames: {system.frameStats}")
+        for name, timing in system.timings.asdict().items():
+            print(f"  {name:<16} n={timing['count']:<6} p50={timing['p50']:.2f} ms p99={timing['p99']:.2f} ms "
+                  f"max={timing['max']:.2f} ms")
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
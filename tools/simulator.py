@@ -0,0 +1,325 @@
+"""
+Local DO5437 controller simulator for offline testing and load generation.
+
+Implements the part of the Dobiss LAN protocol that the integration speaks: the
+installation bitmap, module descriptions, output name tables, status requests and
+action frames, each answered with the echo of the request and the response, both
+padded to 32 bytes. Latency, jitter, dropped bytes and refused connections (the
+simulator stops listening for a while, as a controller that is rebooting) can be
+injected to measure throughput and failure behaviour. With push, outputs changed by a
+wall switch (setOutput) are sent to every client unsolicited, as a status request echo
+followed by the status, for testing the push listener.
+
+Usage: python tools/simulator.py --relays 4 --dimmers 2 --latency 5 --jitter 2 [--push]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import struct
+
+MAX_MODULES = 82
+
+RELAIS = 0x08
+DIMMER = 0x10
+V0_10 = 0x18
+
+LIGHT, PLUG, FAN, UP, DOWN = range(5)
+
+# Output icon types of a relay module: lights, a plug, a fan and one cover (Up/Down pair)
+RELAY_LAYOUT = [LIGHT] * 8 + [PLUG, FAN, UP, DOWN]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def pad(data):
+    """data padded with zeros to a multiple of 32 bytes."""
+    return bytes(data) + bytes((32 - len(data) % 32) % 32)
+
+
+class SimulatedModule:
+    """A module with its output names, types and values."""
+
+    def __init__(self, address, moduleType, isMaster=False):
+        self.address = address
+        self.type = moduleType
+        self.isMaster = isMaster
+        self.outputCount = 12 if moduleType == RELAIS else 4
+        self.values = bytearray(self.outputCount)
+
+        if moduleType == RELAIS:
+            self.outputTypes = list(RELAY_LAYOUT)
+        else:
+            self.outputTypes = [LIGHT] * self.outputCount
+        kind = {RELAIS: "Relay", DIMMER: "Dimmer", V0_10: "0-10V"}[moduleType]
+        self.names = []
+        for index, outputType in enumerate(self.outputTypes):
+            suffix = {UP: " up", DOWN: " down"}.get(outputType)
+            self.names.append(f"Cover {address}{suffix}" if suffix else f"{kind} {address}.{index}")
+
+    def record(self):
+        """The 16-byte module description."""
+        data = bytearray(16)
+        data[0] = self.address
+        data[2] = 1 if self.isMaster else 0
+        data[14] = self.type
+        return data
+
+    def outputTable(self, count):
+        """count output lines of 32 bytes: the name, the icon type and the group index."""
+        lines = []
+        for index in range(min(count, self.outputCount)):
+            outputType = self.outputTypes[index]
+            # The Up and Down output of a cover share their group index
+            groupIndex = 0xFF if outputType not in (UP, DOWN) else 1
+            lines.append(struct.pack(">30sBB", self.names[index].encode(), outputType, groupIndex))
+        return b"".join(lines).ljust(32 * count, b"\x00")
+
+    def status(self):
+        """The 16-byte status record."""
+        return bytes(self.values).ljust(16, b"\x00")
+
+    def apply(self, outputIndex, action, value):
+        if outputIndex >= self.outputCount:
+            return
+        if action == 0x00:
+            self.values[outputIndex] = 0
+        elif action == 0x01:
+            self.values[outputIndex] = 100 if self.type == RELAIS else min(value, 100)
+        elif action == 0x02:
+            self.values[outputIndex] = 0 if self.values[outputIndex] else 100
+
+
+class DobissSimulator:
+    """An asyncio TCP server behaving like a DO5437 with the given modules.
+
+       latency and jitter are in seconds; dropRate is the chance that a response loses one
+       byte. refuseRate is the chance that the simulator stops listening for refuseTime
+       seconds, drawn when it starts and after each connection it accepts, so connects
+       in that time are refused (see refused).
+       With push, setOutput sends the new status of the module to every connected client.
+    """
+
+    def __init__(self, relays=1, dimmers=0, v0_10=0, latency=0.0, jitter=0.0, dropRate=0.0, refuseRate=0.0,
+                 seed=None, push=False, refuseTime=1.0):
+        if relays + dimmers + v0_10 > MAX_MODULES:
+            raise ValueError(f"At most {MAX_MODULES} modules are supported")
+
+        self.modules = {}
+        types = [RELAIS] * relays + [DIMMER] * dimmers + [V0_10] * v0_10
+        for address, moduleType in enumerate(types, start=1):
+            self.modules[address] = SimulatedModule(address, moduleType, isMaster=(address == 1))
+
+        self.latency = latency
+        self.jitter = jitter
+        self.dropRate = dropRate
+        self.refuseRate = refuseRate
+        self.refuseTime = refuseTime
+        self.push = push
+        self._random = random.Random(seed)
+        self._senders = set()  # The send function of every connected client
+        self._clients = {}  # The writer of every connected client, by the task handling it
+
+        self.server = None
+        self.host = None
+        self.port = None
+        self._reopen = None  # The task listening again after refusing connections
+        self.connections = 0
+        self.refused = 0  # Times the simulator stopped listening to refuse connections
+        self.frames = 0
+        self.droppedBytes = 0
+        self.pushes = 0
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start listening; port 0 picks a free port (see self.port)."""
+        self.host = host
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._maybeRefuse()
+        return self
+
+    async def stop(self):
+        if self._reopen is not None:
+            self._reopen.cancel()
+            self._reopen = None
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        # Let the clients see the connection close rather than cancelling their handlers
+        for writer in self._clients.values():
+            writer.close()
+        await asyncio.gather(*self._clients, return_exceptions=True)
+
+    def _maybeRefuse(self):
+        """Stop listening for refuseTime seconds with a chance of refuseRate. Open connections are kept."""
+        if self.server is None or self._random.random() >= self.refuseRate:
+            return
+        self.refused += 1
+        self.server.close()
+        self.server = None
+        self._reopen = asyncio.get_running_loop().create_task(self._listenLater())
+
+    async def _listenLater(self):
+        await asyncio.sleep(self.refuseTime)
+        self._reopen = None
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    def setOutput(self, address, outputIndex, value):
+        """Change an output as if a wall switch was pressed."""
+        module = self.modules[address]
+        module.values[outputIndex] = value
+        if self.push:
+            frame = bytes([0xAF, 0x01, module.type, address, 0x00, 0x00, 0x00, 0x01, 0x00]) + b"\xFF" * 6 + b"\xAF"
+            for send in self._senders:
+                send(pad(frame) + pad(module.status()))
+                self.pushes += 1
+
+    def _installation(self):
+        bitmap = 0
+        for address in self.modules:
+            bitmap |= 1 << (address - 1)
+        return bitmap.to_bytes(16, "little")
+
+    def _respond(self, frame):
+        """The response data to a 16-byte request frame, or None if the frame announces action records."""
+        command, address, subCommand = frame[1], frame[3], frame[4]
+        module = self.modules.get(address)
+
+        if command == 0x0B:
+            return self._installation()
+        if command == 0x10 and subCommand == 0x00 and module:
+            return module.record()
+        if command == 0x10 and subCommand == 0x01 and module:
+            return module.outputTable(frame[7])
+        if command == 0x01 and module:
+            return module.status()
+        if command == 0x02:
+            return None
+
+        _LOGGER.debug(f"Unsupported frame {frame.hex(' ')}")
+        return b""
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._clients[asyncio.current_task()] = writer
+        self._maybeRefuse()
+
+        loop = asyncio.get_running_loop()
+        lastSendAt = 0.0
+
+        def send(data):
+            nonlocal lastSendAt
+            if self.dropRate and self._random.random() < self.dropRate and data:
+                position = self._random.randrange(len(data))
+                data = data[:position] + data[position + 1:]
+                self.droppedBytes += 1
+            # Keep the responses in order, whatever the jitter; timers due at the same time may run in any order
+            delay = self.latency + self._random.uniform(0, self.jitter) if (self.latency or self.jitter) else 0
+            sendAt = max(loop.time() + delay, lastSendAt + 1e-6)
+            lastSendAt = sendAt
+            loop.call_at(sendAt, lambda: writer.is_closing() or writer.write(data))
+
+        buffer = bytearray()
+        pendingActions = None  # (address, size) of the action records we wait for
+        self._senders.add(send)
+        try:
+            while True:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                buffer += data
+
+                while True:
+                    if pendingActions is not None:
+                        address, size = pendingActions
+                        if len(buffer) < size:
+                            break
+                        records = bytes(buffer[:size])
+                        del buffer[:size]
+                        pendingActions = None
+                        for (moduleAddr, outputIndex, action, _, _, value, _, _) in struct.iter_unpack(">8B",
+                                                                                                        records):
+                            if moduleAddr in self.modules:
+                                self.modules[moduleAddr].apply(outputIndex, action, value)
+                        send(pad(records))
+                        continue
+
+                    # Skip anything that is not the start of a frame
+                    start = buffer.find(0xAF)
+                    if start < 0:
+                        buffer.clear()
+                        break
+                    del buffer[:start]
+                    if len(buffer) < 16:
+                        break
+
+                    frame = bytes(buffer[:16])
+                    del buffer[:16]
+                    self.frames += 1
+
+                    response = self._respond(frame)
+                    if response is None:
+                        send(pad(frame))
+                        pendingActions = (frame[3], frame[6] * frame[7])
+                    elif response:
+                        send(pad(frame) + pad(response))
+                    else:
+                        send(pad(frame))
+        except ConnectionError:
+            pass
+        finally:
+            self._senders.discard(send)
+            del self._clients[asyncio.current_task()]
+            writer.close()
+
+
+async def pressSwitches(simulator, interval):
+    """Toggle a random output every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        module = simulator._random.choice(list(simulator.modules.values()))
+        outputIndex = simulator._random.randrange(module.outputCount)
+        simulator.setOutput(module.address, outputIndex, 0 if module.values[outputIndex] else 100)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Simulate a Dobiss DO5437 LAN controller")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=10001)
+    parser.add_argument("--relays", type=int, default=4, help="Number of relay modules (12 outputs)")
+    parser.add_argument("--dimmers", type=int, default=2, help="Number of dimmer modules (4 outputs)")
+    parser.add_argument("--v0-10", type=int, default=0, help="Number of 0-10V modules (4 outputs)")
+    parser.add_argument("--latency", type=float, default=0, help="Response latency (ms)")
+    parser.add_argument("--jitter", type=float, default=0, help="Additional random latency (ms)")
+    parser.add_argument("--drop", type=float, default=0, help="Chance a response loses a byte")
+    parser.add_argument("--refuse", type=float, default=0,
+                        help="Chance the simulator refuses connections for REFUSE_TIME seconds after accepting one")
+    parser.add_argument("--refuse-time", type=float, default=1, help="Seconds connections are refused for")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--push", action="store_true", help="Push output changes to the clients")
+    parser.add_argument("--press", type=float, default=0,
+                        help="Toggle a random output every PRESS seconds, as if a wall switch was pressed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    simulator = DobissSimulator(args.relays, args.dimmers, args.v0_10, args.latency / 1000, args.jitter / 1000,
+                                args.drop, args.refuse, args.seed, args.push,
+                                args.refuse_time)
+    await simulator.start(args.host, args.port)
+    _LOGGER.info(f"Simulating {len(simulator.modules)} modules on {args.host}:{simulator.port}")
+    if args.press:
+        asyncio.get_running_loop().create_task(pressSwitches(simulator, args.press))
+    try:
+        # The server is replaced while refusing connections, so wait here rather than in serve_forever
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass